@@ -0,0 +1,20 @@
+"""Gunicorn settings for serving src.wsgi:app.
+
+The capture scheduler lives in the web process, so there is a single
+worker process and concurrency comes from threads.
+"""
+
+import os
+
+bind = f"{os.environ.get('RTSPSE_HOST', '0.0.0.0')}:{os.environ.get('RTSPSE_PORT', '5050')}"
+
+# More than one worker would run every scheduled capture once per worker
+workers = 1
+
+# Threads suit OpenCV/FFmpeg calls that block in C. gevent workers are not
+# supported: the scheduler, stream and config-save threads would all block
+# its event loop once monkey-patched.
+worker_class = "gthread"
+threads = 2 * (os.cpu_count() or 1) + 1
+
+timeout = 120
@@ -1,29 +1,165 @@
 """RTSP capture module for capturing frames from camera streams."""
 
 import logging
+import os
+import subprocess
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
-from typing import Optional
+from typing import Iterator, Optional
 
 import cv2
+import numpy as np
 
 from .models import CameraConfig, CaptureSettings
+from .storage import LEGACY_INDEX_FILENAME, CaptureIndex, iter_jpg_files, timestamp_to_iso
 
 logger = logging.getLogger(__name__)
 
+# libjpeg-turbo is optional; fall back to cv2.imwrite when it is unavailable
+try:
+    from turbojpeg import TurboJPEG, TJPF_BGR, TJSAMP_420
+    _turbojpeg = TurboJPEG()
+except (ImportError, OSError, RuntimeError):
+    _turbojpeg = None
+
+# Hardware decode backends accepted by CaptureSettings.hwaccel
+HW_ACCELERATION = {
+    "any": cv2.VIDEO_ACCELERATION_ANY,
+    "d3d11": cv2.VIDEO_ACCELERATION_D3D11,
+    "vaapi": cv2.VIDEO_ACCELERATION_VAAPI,
+    "mfx": cv2.VIDEO_ACCELERATION_MFX,
+}
+
+# The same hwaccel names as understood by the ffmpeg CLI
+FFMPEG_HWACCEL = {
+    "any": "auto",
+    "d3d11": "d3d11va",
+    "vaapi": "vaapi",
+    "mfx": "qsv",
+}
+
 
 class CaptureError(Exception):
     """Error during frame capture."""
     pass
 
 
+class _OpenStream:
+    """A VideoCapture kept open between captures of one camera.
+
+    Nothing reads the stream between captures, so no decoding happens while
+    it sits idle; frames queued in the meantime are flushed by read().
+    """
+
+    def __init__(self, key: tuple, cap: cv2.VideoCapture):
+        self.key = key
+        self.cap = cap
+        self.last_used = time.monotonic()
+        self.reused = False
+
+        # Half a frame interval: grabs quicker than this came out of a buffer
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        self._live_grab_seconds = 0.5 / min(max(fps or 25.0, 1.0), 120.0)
+
+    def read(self, skip_frames: int, timeout: float):
+        """Read a live frame, discarding skip_frames first; None on failure."""
+        if self.reused and not self._flush(timeout):
+            return None
+
+        for _ in range(skip_frames):
+            if not self.cap.grab():
+                return None
+
+        ret, frame = self.cap.read()
+        self.last_used = time.monotonic()
+        self.reused = True
+        return frame if ret else None
+
+    def _flush(self, timeout: float) -> bool:
+        """Grab past the frames buffered while idle, until one has to be waited for.
+
+        Returns False if the stream fails or the backlog outlasts the timeout.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            started = time.monotonic()
+            if not self.cap.grab():
+                return False
+            if time.monotonic() - started > self._live_grab_seconds:
+                return True
+            # Still draining the backlog; a fresh connection is quicker than this
+            if started > deadline:
+                return False
+
+    def close(self) -> None:
+        """Release the stream."""
+        self.cap.release()
+
+
 class CaptureManager:
     """Manages RTSP frame capture."""
 
-    def __init__(self, captures_path: Path):
+    def __init__(
+        self,
+        captures_path: Path,
+        stream_idle_timeout: float = 60.0,
+        reconcile_interval: Optional[float] = None,
+        index_path: Optional[Path] = None
+    ):
         self.captures_path = Path(captures_path)
         self.captures_path.mkdir(parents=True, exist_ok=True)
+        self.captures_root = self.captures_path.resolve()
+
+        self._ensured_dirs: set[Path] = set()
+
+        # Bounded pool reused by capture_frames and get_storage_stats. Their
+        # tasks never submit to it themselves, so it can't deadlock on itself;
+        # scheduled captures stay on APScheduler's own pool for that reason.
+        self._pool = ThreadPoolExecutor(max_workers=16, thread_name_prefix="capture")
+
+        self._remove_legacy_index(index_path)
+        self.index = CaptureIndex(self.captures_path, index_path)
+        self.index.reconcile()
+
+        # Streams are reused across captures and closed after sitting idle
+        self.stream_idle_timeout = stream_idle_timeout
+        self._streams: dict[str, _OpenStream] = {}
+        self._camera_locks: dict[str, threading.Lock] = {}
+        self._streams_lock = threading.Lock()
+        self._closed = threading.Event()
+        self._reaper: Optional[threading.Thread] = None
+
+        # Captures are indexed as they are taken, so only changes made outside
+        # the process (retention, manual pruning) need a rescan. Each pass walks
+        # the whole capture tree, so it is off unless an interval is given.
+        self.reconcile_interval = reconcile_interval
+        self._reconciler: Optional[threading.Thread] = None
+        if reconcile_interval:
+            self._reconciler = threading.Thread(
+                target=self._reconcile_periodically,
+                name="index-reconcile",
+                daemon=True
+            )
+            self._reconciler.start()
+
+    def _remove_legacy_index(self, index_path: Optional[Path]) -> None:
+        """Delete an index left inside the captures directory by earlier versions.
+
+        It is rebuilt at startup anyway. Nothing is removed when index_path
+        is configured to be that same file.
+        """
+        legacy_path = self.captures_root / LEGACY_INDEX_FILENAME
+        if index_path and Path(index_path).resolve() == legacy_path:
+            return
+
+        for suffix in ("", "-wal", "-shm"):
+            try:
+                Path(f"{legacy_path}{suffix}").unlink()
+            except FileNotFoundError:
+                pass
 
     def capture_frame(
         self,
@@ -63,54 +199,277 @@ class CaptureManager:
         logger.error(f"All capture attempts failed for '{camera.name}': {last_error}")
         return None
 
+    def capture_frames(self, cameras: list[CameraConfig]) -> list[Optional[Path]]:
+        """
+        Capture a frame from several cameras in parallel.
+
+        Args:
+            cameras: Camera configurations to capture from
+
+        Returns:
+            Saved image paths (or None on failure) in the same order as cameras
+        """
+        if not cameras:
+            return []
+
+        # Captures wait on the network and in OpenCV with the GIL released
+        return list(self._pool.map(self.capture_frame, cameras))
+
     def _do_capture(
         self,
         camera: CameraConfig,
         settings: CaptureSettings
     ) -> Path:
         """Execute a single capture attempt."""
-        cap = cv2.VideoCapture(camera.url)
-
+        if settings.backend == "ffmpeg":
+            frame = self._read_frame_ffmpeg(camera, settings)
+        else:
+            with self._camera_lock(camera.name):
+                frame = self._read_frame(camera, settings)
+
+        # The ffmpeg backend already scaled the frame while decoding
+        if (
+            settings.backend != "ffmpeg"
+            and settings.resolution_scale
+            and settings.resolution_scale != 1.0
+        ):
+            width = int(frame.shape[1] * settings.resolution_scale)
+            height = int(frame.shape[0] * settings.resolution_scale)
+            # INTER_AREA box-filters large downscales without aliasing
+            if settings.resolution_scale < 1.0:
+                interpolation = cv2.INTER_AREA
+            else:
+                interpolation = cv2.INTER_CUBIC
+            frame = cv2.resize(frame, (width, height), interpolation=interpolation)
+
+        output_path = self._get_output_path(camera.name)
         try:
-            cap.set(cv2.CAP_PROP_OPEN_TIMEOUT_MSEC, settings.timeout_seconds * 1000)
-            cap.set(cv2.CAP_PROP_READ_TIMEOUT_MSEC, settings.timeout_seconds * 1000)
+            self._write_jpeg(frame, output_path, settings.jpeg_quality)
+        except CaptureError:
+            # The directory may have been removed; recreate it on retry
+            self._ensured_dirs.discard(output_path.parent)
+            raise
+        self.index.add(camera.name, output_path)
+
+        logger.info(f"Captured frame from '{camera.name}' -> {output_path}")
+        return output_path
+
+    def _read_frame(self, camera: CameraConfig, settings: CaptureSettings):
+        """Read a frame through the camera's cached stream, opening it if needed."""
+        key = (camera.url, settings.hwaccel, settings.timeout_seconds)
+        stream = self._streams.get(camera.name)
+
+        if stream is not None and stream.key != key:
+            self._close_stream(camera.name)
+            stream = None
+
+        if stream is not None:
+            # Cameras often drop idle sessions, so a failed read on a cached
+            # stream gets one fresh connection before the attempt fails
+            frame = stream.read(0, settings.timeout_seconds)
+            if frame is not None:
+                return frame
+            self._close_stream(camera.name)
+
+        cap = self._open_stream(camera.url, settings.timeout_seconds, settings.hwaccel)
+        if not cap.isOpened():
+            cap.release()
+            raise CaptureError(f"Failed to open stream: {camera.url}")
 
-            if not cap.isOpened():
-                raise CaptureError(f"Failed to open stream: {camera.url}")
+        stream = _OpenStream(key, cap)
+        with self._streams_lock:
+            self._streams[camera.name] = stream
+        self._start_reaper()
 
-            ret, frame = cap.read()
-            if not ret or frame is None:
-                raise CaptureError("Failed to read frame from stream")
+        # A new stream skips prewarm_frames so decoding can reach a keyframe
+        frame = stream.read(settings.prewarm_frames, settings.timeout_seconds)
+        if frame is None:
+            self._close_stream(camera.name)
+            raise CaptureError("Failed to read frame from stream")
 
-            if settings.resolution_scale and settings.resolution_scale != 1.0:
-                width = int(frame.shape[1] * settings.resolution_scale)
-                height = int(frame.shape[0] * settings.resolution_scale)
-                frame = cv2.resize(frame, (width, height))
+        return frame
 
-            output_path = self._get_output_path(camera.name)
-            encode_params = [cv2.IMWRITE_JPEG_QUALITY, settings.jpeg_quality]
+    def _read_frame_ffmpeg(self, camera: CameraConfig, settings: CaptureSettings):
+        """Grab a single frame with the ffmpeg CLI, scaling it inside the decoder pipeline."""
+        cmd = ["ffmpeg", "-nostdin", "-loglevel", "error"]
 
-            success = cv2.imwrite(str(output_path), frame, encode_params)
-            if not success:
-                raise CaptureError(f"Failed to write image to {output_path}")
+        if settings.hwaccel:
+            hwaccel = FFMPEG_HWACCEL.get(settings.hwaccel.lower())
+            if hwaccel is None:
+                logger.warning(f"Unknown hwaccel '{settings.hwaccel}', using software decode")
+            else:
+                cmd.extend(["-hwaccel", hwaccel])
+        if camera.url.startswith(("rtsp://", "rtsps://")):
+            cmd.extend(["-rtsp_transport", "tcp"])
 
-            logger.info(f"Captured frame from '{camera.name}' -> {output_path}")
-            return output_path
+        cmd.extend(["-i", camera.url, "-frames:v", "1"])
 
-        finally:
-            cap.release()
+        scale = settings.resolution_scale
+        if scale and scale != 1.0:
+            flags = "area" if scale < 1.0 else "bicubic"
+            cmd.extend(["-vf", f"scale=trunc(iw*{scale}):trunc(ih*{scale}):flags={flags}"])
+
+        # BMP is uncompressed, so decoding it here is just a copy
+        cmd.extend(["-f", "image2pipe", "-c:v", "bmp", "-"])
+
+        try:
+            # Matches the OpenCV path's separate open and read timeouts
+            result = subprocess.run(
+                cmd,
+                capture_output=True,
+                timeout=settings.timeout_seconds * 2
+            )
+        except subprocess.TimeoutExpired:
+            raise CaptureError(f"Timed out reading frame from {camera.url}")
+        except OSError as e:
+            raise CaptureError(f"Failed to run FFmpeg: {e}")
+
+        if result.returncode != 0 or not result.stdout:
+            stderr = result.stderr.decode(errors="replace").strip()
+            raise CaptureError(f"FFmpeg failed to read frame: {stderr}")
+
+        frame = cv2.imdecode(np.frombuffer(result.stdout, np.uint8), cv2.IMREAD_COLOR)
+        if frame is None:
+            raise CaptureError("Failed to decode frame from FFmpeg")
+        return frame
+
+    def _camera_lock(self, camera_name: str) -> threading.Lock:
+        """Get the lock serializing access to a camera's stream."""
+        with self._streams_lock:
+            return self._camera_locks.setdefault(camera_name, threading.Lock())
+
+    def _close_stream(self, camera_name: str) -> None:
+        """Release and forget a camera's cached stream."""
+        with self._streams_lock:
+            stream = self._streams.pop(camera_name, None)
+        if stream is not None:
+            stream.close()
+
+    def _start_reaper(self) -> None:
+        """Start the thread that closes idle streams, if not already running."""
+        with self._streams_lock:
+            if self._reaper is not None or self._closed.is_set():
+                return
+            self._reaper = threading.Thread(
+                target=self._reap_idle_streams,
+                name="stream-reaper",
+                daemon=True
+            )
+            self._reaper.start()
+
+    def _reap_idle_streams(self) -> None:
+        """Periodically close streams that have not been used recently."""
+        interval = max(1.0, self.stream_idle_timeout / 2)
+
+        while not self._closed.wait(interval):
+            now = time.monotonic()
+            with self._streams_lock:
+                idle = [
+                    name for name, stream in self._streams.items()
+                    if now - stream.last_used > self.stream_idle_timeout
+                ]
+
+            for name in idle:
+                lock = self._camera_lock(name)
+                # A camera in the middle of a capture is not idle
+                if not lock.acquire(blocking=False):
+                    continue
+                try:
+                    stream = self._streams.get(name)
+                    if stream and time.monotonic() - stream.last_used > self.stream_idle_timeout:
+                        self._close_stream(name)
+                        logger.debug(f"Closed idle stream for '{name}'")
+                finally:
+                    lock.release()
+
+    def _reconcile_periodically(self) -> None:
+        """Reconcile the capture index with the disk until closed."""
+        while not self._closed.wait(self.reconcile_interval):
+            try:
+                self.index.reconcile()
+            except Exception as e:
+                logger.error(f"Failed to reconcile capture index: {e}")
+
+    def close(self) -> None:
+        """Close all cached streams, the worker pool and the capture index."""
+        self._closed.set()
+        self._pool.shutdown(wait=True, cancel_futures=True)
+        for name in list(self._streams):
+            with self._camera_lock(name):
+                self._close_stream(name)
+        if self._reconciler:
+            self._reconciler.join()
+        self.index.close()
+
+    def _open_stream(
+        self,
+        url: str,
+        timeout_seconds: int,
+        hwaccel: Optional[str] = None
+    ) -> cv2.VideoCapture:
+        """Open a stream with the FFmpeg backend, optionally hardware decoded."""
+        timeout_ms = timeout_seconds * 1000
+        params = [
+            cv2.CAP_PROP_OPEN_TIMEOUT_MSEC, timeout_ms,
+            cv2.CAP_PROP_READ_TIMEOUT_MSEC, timeout_ms,
+        ]
+
+        if hwaccel:
+            acceleration = HW_ACCELERATION.get(hwaccel.lower())
+            if acceleration is None:
+                logger.warning(f"Unknown hwaccel '{hwaccel}', using software decode")
+            else:
+                params.extend([cv2.CAP_PROP_HW_ACCELERATION, acceleration])
+
+        return cv2.VideoCapture(url, cv2.CAP_FFMPEG, params)
+
+    def _write_jpeg(self, frame, output_path: Path, quality: int) -> None:
+        """Encode a BGR frame as JPEG and write it to disk."""
+        if _turbojpeg is not None:
+            try:
+                jpeg_bytes = _turbojpeg.encode(
+                    frame,
+                    quality=quality,
+                    pixel_format=TJPF_BGR,
+                    jpeg_subsample=TJSAMP_420
+                )
+                output_path.write_bytes(jpeg_bytes)
+                return
+            except OSError as e:
+                raise CaptureError(f"Failed to write image to {output_path}: {e}")
+
+        # Baseline 4:2:0 without Huffman optimisation, matching the TurboJPEG path
+        encode_params = [
+            cv2.IMWRITE_JPEG_QUALITY, quality,
+            cv2.IMWRITE_JPEG_OPTIMIZE, 0,
+            cv2.IMWRITE_JPEG_PROGRESSIVE, 0,
+            cv2.IMWRITE_JPEG_SAMPLING_FACTOR, cv2.IMWRITE_JPEG_SAMPLING_FACTOR_420,
+        ]
+        if not cv2.imwrite(str(output_path), frame, encode_params):
+            raise CaptureError(f"Failed to write image to {output_path}")
 
     def _get_output_path(self, camera_name: str) -> Path:
         """Generate output path for a capture."""
         now = datetime.now()
 
-        camera_dir = self.captures_path / camera_name / now.strftime("%Y-%m")
-        camera_dir.mkdir(parents=True, exist_ok=True)
+        # Plain formatting avoids strftime's locale handling on every capture
+        month = f"{now.year:04d}-{now.month:02d}"
+        stamp = f"{month}-{now.day:02d}_{now.hour:02d}-{now.minute:02d}-{now.second:02d}"
 
-        filename = f"{camera_name}_{now.strftime('%Y-%m-%d_%H-%M-%S')}.jpg"
+        camera_dir = self.captures_path / camera_name / month
+        if camera_dir not in self._ensured_dirs:
+            camera_dir.mkdir(parents=True, exist_ok=True)
+            self._ensured_dirs.add(camera_dir)
+
+        filename = f"{camera_name}_{stamp}.jpg"
         return camera_dir / filename
 
-    def test_connection(self, url: str, timeout_seconds: int = 10) -> dict:
+    def test_connection(
+        self,
+        url: str,
+        timeout_seconds: int = 10,
+        hwaccel: Optional[str] = None
+    ) -> dict:
         """
         Test connection to an RTSP stream.
 
@@ -125,12 +484,17 @@ class CaptureManager:
             "error": None
         }
 
-        cap = cv2.VideoCapture(url)
+        # Cameras often allow few concurrent sessions, so give up any cached
+        # stream to the same URL instead of opening a second one next to it
+        with self._streams_lock:
+            cached = [name for name, stream in self._streams.items() if stream.key[0] == url]
+        for name in cached:
+            with self._camera_lock(name):
+                self._close_stream(name)
 
-        try:
-            cap.set(cv2.CAP_PROP_OPEN_TIMEOUT_MSEC, timeout_seconds * 1000)
-            cap.set(cv2.CAP_PROP_READ_TIMEOUT_MSEC, timeout_seconds * 1000)
+        cap = self._open_stream(url, timeout_seconds, hwaccel)
 
+        try:
             if not cap.isOpened():
                 result["error"] = "Failed to open stream"
                 return result
@@ -161,77 +525,69 @@ class CaptureManager:
         end_date: Optional[datetime] = None
     ) -> list[Path]:
         """Get list of capture files for a camera within date range."""
-        camera_dir = self.captures_path / camera_name
-
-        if not camera_dir.exists():
-            return []
-
-        captures = []
-        for img_path in camera_dir.rglob("*.jpg"):
-            try:
-                filename = img_path.stem
-                date_str = "_".join(filename.split("_")[1:])
-                capture_time = datetime.strptime(date_str, "%Y-%m-%d_%H-%M-%S")
-
-                if start_date and capture_time < start_date:
-                    continue
-                if end_date and capture_time > end_date:
-                    continue
+        return [
+            self.captures_path / rel_path
+            for rel_path in self.index.captures_for_camera(camera_name, start_date, end_date)
+        ]
 
-                captures.append(img_path)
-            except ValueError:
-                continue
-
-        captures.sort(key=lambda p: p.name)
-        return captures
-
-    def get_recent_captures(self, limit: int = 20) -> list[dict]:
-        """Get most recent captures across all cameras."""
-        all_captures = []
-
-        for camera_dir in self.captures_path.iterdir():
-            if not camera_dir.is_dir():
-                continue
-
-            camera_name = camera_dir.name
+    def get_capture_summaries(self) -> dict[str, dict]:
+        """Get each camera's capture count and newest capture without listing them all."""
+        return {
+            camera_name: {
+                "count": count,
+                "last_capture": rel_path.rsplit("/", 1)[-1],
+                "path": rel_path.replace("/", os.sep),
+                "timestamp": timestamp_to_iso(stamp)
+            }
+            for camera_name, (count, stamp, rel_path) in self.index.camera_summaries().items()
+        }
 
-            for img_path in camera_dir.rglob("*.jpg"):
-                try:
-                    filename = img_path.stem
-                    date_str = "_".join(filename.split("_")[1:])
-                    capture_time = datetime.strptime(date_str, "%Y-%m-%d_%H-%M-%S")
-
-                    all_captures.append({
-                        "camera": camera_name,
-                        "path": str(img_path.relative_to(self.captures_path)),
-                        "timestamp": capture_time.isoformat(),
-                        "filename": img_path.name
-                    })
-                except ValueError:
-                    continue
+    def get_recent_captures(
+        self,
+        limit: int = 20,
+        camera_name: Optional[str] = None
+    ) -> list[dict]:
+        """Get most recent captures across all cameras, or of one camera."""
+        return list(self.iter_recent_captures(limit, camera_name))
 
-        all_captures.sort(key=lambda x: x["timestamp"], reverse=True)
-        return all_captures[:limit]
+    def iter_recent_captures(
+        self,
+        limit: int = 20,
+        camera_name: Optional[str] = None
+    ) -> Iterator[dict]:
+        """Yield the most recent captures, newest first, formatting each lazily."""
+        # The index returns only the newest rows, already sorted, so each
+        # row just needs cheap string formatting
+        for camera, stamp, rel_path in self.index.recent(limit, camera_name):
+            yield {
+                "camera": camera,
+                "path": rel_path.replace("/", os.sep),
+                "timestamp": timestamp_to_iso(stamp),
+                "filename": rel_path.rsplit("/", 1)[-1]
+            }
 
     def get_storage_stats(self) -> dict:
-        """Get storage statistics for captures."""
+        """Get storage statistics for captures.
+
+        These walk the disk rather than the index: the index holds no file
+        sizes, only picks up outside changes on reconcile, and skips files
+        not named like captures, which still take up space.
+        """
         total_size = 0
         total_files = 0
         cameras = {}
 
-        for camera_dir in self.captures_path.iterdir():
-            if not camera_dir.is_dir():
-                continue
+        with os.scandir(self.captures_path) as it:
+            camera_dirs = [entry for entry in it if entry.is_dir()]
 
-            camera_name = camera_dir.name
-            camera_size = 0
-            camera_files = 0
+        if not camera_dirs:
+            return {"total_size_bytes": 0, "total_files": 0, "cameras": {}}
 
-            for img_path in camera_dir.rglob("*.jpg"):
-                camera_size += img_path.stat().st_size
-                camera_files += 1
+        # Camera trees are independent, so overlap their metadata reads
+        results = list(self._pool.map(self._camera_storage_stats, camera_dirs))
 
-            cameras[camera_name] = {
+        for camera_dir, (camera_size, camera_files) in zip(camera_dirs, results):
+            cameras[camera_dir.name] = {
                 "size_bytes": camera_size,
                 "file_count": camera_files
             }
@@ -243,3 +599,15 @@ class CaptureManager:
             "total_files": total_files,
             "cameras": cameras
         }
+
+    def _camera_storage_stats(self, camera_dir: os.DirEntry) -> tuple[int, int]:
+        """Get (total bytes, file count) of one camera's captures."""
+        camera_size = 0
+        camera_files = 0
+
+        # DirEntry.stat() reuses what scandir already fetched where it can
+        for entry in iter_jpg_files(camera_dir.path):
+            camera_size += entry.stat().st_size
+            camera_files += 1
+
+        return camera_size, camera_files
@@ -2,11 +2,18 @@
 
 import logging
 import os
+import threading
 from pathlib import Path
-from typing import Optional
+from typing import Any, Optional
 
 import yaml
 
+# Prefer the libyaml C bindings; PyYAML's pure-Python classes are much slower
+try:
+    from yaml import CSafeLoader as YamlLoader, CSafeDumper as YamlDumper
+except ImportError:
+    from yaml import SafeLoader as YamlLoader, SafeDumper as YamlDumper
+
 from .models import (
     AppConfig,
     CameraConfig,
@@ -20,6 +27,21 @@ logger = logging.getLogger(__name__)
 # Default config directory relative to project root
 DEFAULT_CONFIG_DIR = Path(__file__).parent.parent / "config"
 
+# Capture index database, kept in the config directory unless configured
+INDEX_FILENAME = "captures.index.db"
+
+
+def _file_signature(path: Path) -> tuple[int, int]:
+    """Get the (st_mtime_ns, st_size) pair used to detect file changes."""
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+
+def _load_yaml(path: Path) -> Any:
+    """Parse a YAML config file."""
+    with open(path) as f:
+        return yaml.load(f, Loader=YamlLoader) or {}
+
 
 class ConfigError(Exception):
     """Configuration error."""
@@ -35,9 +57,20 @@ class ConfigManager:
 
         self.app_config: AppConfig = AppConfig()
         self.cameras: dict[str, CameraConfig] = {}
+        self.camera_digests: dict[str, bytes] = {}
+        self.cameras_version = 0  # Bumped whenever the cameras are loaded or saved
+        # Serializes writes of cameras.yaml and reloads of it; reentrant, since
+        # a reload first flushes a pending save
+        self._cameras_save_lock = threading.RLock()
+        self._cameras_timer_lock = threading.Lock()
+        self._cameras_save_timer: Optional[threading.Timer] = None
         self.export_presets: dict[str, ExportPreset] = {}
         self.pending_exports: list[PendingExport] = []
         self.export_history: list[ExportHistory] = []
+        self._exports_lock = threading.Lock()
+
+        # (st_mtime_ns, st_size) of each config file when it was last applied
+        self._signatures: dict[Path, tuple[int, int]] = {}
 
         self._ensure_config_files()
 
@@ -77,7 +110,7 @@ class ConfigManager:
             "log_level": "INFO"
         }
         with open(path, "w") as f:
-            yaml.dump(default, f, default_flow_style=False, sort_keys=False)
+            yaml.dump(default, f, Dumper=YamlDumper, default_flow_style=False, sort_keys=False)
         logger.info(f"Created default app config at {path}")
 
     def _write_default_cameras_config(self, path: Path) -> None:
@@ -108,7 +141,7 @@ class ConfigManager:
             }
         }
         with open(path, "w") as f:
-            yaml.dump(default, f, default_flow_style=False, sort_keys=False)
+            yaml.dump(default, f, Dumper=YamlDumper, default_flow_style=False, sort_keys=False)
         logger.info(f"Created default cameras config at {path}")
 
     def _write_default_exports_config(self, path: Path) -> None:
@@ -140,7 +173,7 @@ class ConfigManager:
             "export_history": []
         }
         with open(path, "w") as f:
-            yaml.dump(default, f, default_flow_style=False, sort_keys=False)
+            yaml.dump(default, f, Dumper=YamlDumper, default_flow_style=False, sort_keys=False)
         logger.info(f"Created default exports config at {path}")
 
     def load_all(self) -> None:
@@ -153,9 +186,13 @@ class ConfigManager:
         """Load app.yaml configuration."""
         path = self.config_dir / "app.yaml"
         try:
-            with open(path) as f:
-                data = yaml.safe_load(f) or {}
+            signature = _file_signature(path)
+            if self._signatures.get(path) == signature:
+                return self.app_config
+
+            data = _load_yaml(path)
             self.app_config = AppConfig.from_dict(data)
+            self._signatures[path] = signature
             logger.debug(f"Loaded app config from {path}")
             return self.app_config
         except Exception as e:
@@ -165,18 +202,29 @@ class ConfigManager:
         """Load cameras.yaml configuration."""
         path = self.config_dir / "cameras.yaml"
         try:
-            with open(path) as f:
-                data = yaml.safe_load(f) or {}
+            with self._cameras_save_lock:
+                # Web edits awaiting a delayed save would otherwise be
+                # replaced by the older file, and that state saved over them
+                self.flush_cameras_save()
+
+                signature = _file_signature(path)
+                if self._signatures.get(path) == signature:
+                    return self.cameras
+
+                data = _load_yaml(path)
 
-            cameras_data = data.get("cameras", {})
-            self.cameras = {}
+                cameras_data = data.get("cameras", {})
+                cameras = {}
 
-            for name, cam_data in cameras_data.items():
-                if not self._validate_camera_url(cam_data.get("url", "")):
-                    logger.warning(f"Camera '{name}' has invalid URL, skipping")
-                    continue
-                self.cameras[name] = CameraConfig.from_dict(name, cam_data)
+                for name, cam_data in cameras_data.items():
+                    if not self._validate_camera_url(cam_data.get("url", "")):
+                        logger.warning(f"Camera '{name}' has invalid URL, skipping")
+                        continue
+                    cameras[name] = CameraConfig.from_dict(name, cam_data)
 
+                self.cameras = cameras
+                self._update_camera_digests()
+            self._signatures[path] = signature
             logger.debug(f"Loaded {len(self.cameras)} cameras from {path}")
             return self.cameras
         except Exception as e:
@@ -186,8 +234,11 @@ class ConfigManager:
         """Load exports.yaml configuration."""
         path = self.config_dir / "exports.yaml"
         try:
-            with open(path) as f:
-                data = yaml.safe_load(f) or {}
+            signature = _file_signature(path)
+            if self._signatures.get(path) == signature:
+                return
+
+            data = _load_yaml(path)
 
             # Load presets
             presets_data = data.get("presets", {})
@@ -208,6 +259,7 @@ class ConfigManager:
                 ExportHistory.from_dict(h) for h in history_data
             ]
 
+            self._signatures[path] = signature
             logger.debug(f"Loaded {len(self.export_presets)} export presets")
         except Exception as e:
             raise ConfigError(f"Failed to load exports config: {e}")
@@ -221,9 +273,22 @@ class ConfigManager:
     def save_cameras_config(self) -> None:
         """Save cameras configuration to file."""
         path = self.config_dir / "cameras.yaml"
+
+        with self._cameras_save_lock:
+            data = self._cameras_data()
+            with open(path, "w") as f:
+                yaml.dump(data, f, Dumper=YamlDumper, default_flow_style=False, sort_keys=False)
+            # Cameras edited in place are already applied, so the reload this
+            # save triggers shouldn't see them as changed
+            self._update_camera_digests()
+        logger.info(f"Saved cameras config to {path}")
+
+    def _cameras_data(self) -> dict:
+        """Build the cameras.yaml document from the current cameras."""
         data = {"cameras": {}}
 
-        for name, camera in self.cameras.items():
+        # Snapshot, since web requests may edit cameras while a delayed save runs
+        for name, camera in list(self.cameras.items()):
             cam_data = {
                 "url": camera.url,
                 "enabled": camera.enabled,
@@ -233,12 +298,19 @@ class ConfigManager:
                     "timeout_seconds": camera.capture_settings.timeout_seconds,
                     "retry_count": camera.capture_settings.retry_count,
                     "retry_delay_seconds": camera.capture_settings.retry_delay_seconds,
+                    "prewarm_frames": camera.capture_settings.prewarm_frames,
                 }
             }
 
             if camera.capture_settings.resolution_scale:
                 cam_data["capture_settings"]["resolution_scale"] = camera.capture_settings.resolution_scale
 
+            if camera.capture_settings.hwaccel:
+                cam_data["capture_settings"]["hwaccel"] = camera.capture_settings.hwaccel
+
+            if camera.capture_settings.backend != "opencv":
+                cam_data["capture_settings"]["backend"] = camera.capture_settings.backend
+
             for schedule in camera.schedules:
                 sched_data = {
                     "name": schedule.name,
@@ -255,9 +327,45 @@ class ConfigManager:
 
             data["cameras"][name] = cam_data
 
-        with open(path, "w") as f:
-            yaml.dump(data, f, default_flow_style=False, sort_keys=False)
-        logger.info(f"Saved cameras config to {path}")
+        return data
+
+    def schedule_cameras_save(self, delay: float = 0.2) -> None:
+        """Save cameras configuration after a short delay, coalescing bursts of edits."""
+        # Edits are already applied in memory, so caches keyed on the version expire now
+        self.cameras_version += 1
+        with self._cameras_timer_lock:
+            if self._cameras_save_timer:
+                self._cameras_save_timer.cancel()
+            self._cameras_save_timer = threading.Timer(delay, self._run_cameras_save)
+            self._cameras_save_timer.daemon = True
+            self._cameras_save_timer.start()
+
+    def _run_cameras_save(self) -> None:
+        """Run a save scheduled by schedule_cameras_save."""
+        with self._cameras_save_lock:
+            with self._cameras_timer_lock:
+                # A newer edit or a flush may have taken over after this timer fired
+                if self._cameras_save_timer is not threading.current_thread():
+                    return
+                self._cameras_save_timer = None
+            self.save_cameras_config()
+
+    def flush_cameras_save(self) -> None:
+        """Write a pending delayed save now, e.g. before shutting down or reloading."""
+        with self._cameras_save_lock:
+            with self._cameras_timer_lock:
+                timer, self._cameras_save_timer = self._cameras_save_timer, None
+            if timer:
+                timer.cancel()
+                self.save_cameras_config()
+
+    def _update_camera_digests(self) -> None:
+        """Record the digest of each camera's current configuration."""
+        with self._cameras_save_lock:
+            # Snapshot, since web requests may add or delete cameras meanwhile
+            cameras = list(self.cameras.items())
+            self.camera_digests = {name: camera.content_hash() for name, camera in cameras}
+            self.cameras_version += 1
 
     def save_exports_config(self) -> None:
         """Save exports configuration to file."""
@@ -279,6 +387,8 @@ class ConfigManager:
                 preset_data["width"] = preset.width
             if preset.height:
                 preset_data["height"] = preset.height
+            if preset.hwaccel_encoder:
+                preset_data["hwaccel_encoder"] = preset.hwaccel_encoder
             data["presets"][name] = preset_data
 
         for pending in self.pending_exports:
@@ -306,9 +416,15 @@ class ConfigManager:
             })
 
         with open(path, "w") as f:
-            yaml.dump(data, f, default_flow_style=False, sort_keys=False)
+            yaml.dump(data, f, Dumper=YamlDumper, default_flow_style=False, sort_keys=False)
         logger.info(f"Saved exports config to {path}")
 
+    def add_export_history(self, history: ExportHistory) -> None:
+        """Record a finished export and save it; safe to call from export workers."""
+        with self._exports_lock:
+            self.export_history.append(history)
+            self.save_exports_config()
+
     def get_captures_path(self) -> Path:
         """Get the captures directory path."""
         base = Path(__file__).parent.parent
@@ -319,6 +435,13 @@ class ConfigManager:
         base = Path(__file__).parent.parent
         return base / self.app_config.storage.exports_path
 
+    def get_index_path(self) -> Path:
+        """Get the capture index database path."""
+        if self.app_config.storage.index_path:
+            base = Path(__file__).parent.parent
+            return base / self.app_config.storage.index_path
+        return self.config_dir / INDEX_FILENAME
+
     def get_logs_path(self) -> Path:
         """Get the logs directory path."""
         base = Path(__file__).parent.parent
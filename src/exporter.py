@@ -2,17 +2,48 @@
 
 import logging
 import os
+import shutil
 import subprocess
-import tempfile
+import threading
 import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
-from typing import Optional
+from typing import Callable, Optional
 
 from .models import ExportPreset, ExportHistory
+from .storage import CaptureIndex
 
 logger = logging.getLogger(__name__)
 
+# How many finished exports stay queryable through get_export_progress
+FINISHED_EXPORTS_KEPT = 100
+
+
+# FFmpeg settings for hardware H.264 encoders. "upload" moves frames into
+# GPU memory so "scale" can resize them there instead of on the CPU.
+HW_ENCODERS = {
+    "h264_nvenc": {
+        "args": ["-preset", "p4", "-tune", "hq", "-rc", "vbr"],
+        "upload": "format=nv12,hwupload_cuda",
+        "scale": "scale_cuda={width}:{height}",
+    },
+    "h264_vaapi": {
+        "global_args": ["-vaapi_device", "/dev/dri/renderD128"],
+        "args": [],
+        "upload": "format=nv12,hwupload",
+        "scale": "scale_vaapi=w={width}:h={height}",
+        "always_upload": True,
+    },
+    "h264_qsv": {
+        "args": ["-preset", "medium"],
+    },
+    "h264_videotoolbox": {
+        "args": [],
+    },
+}
+
 
 class ExportError(Exception):
     """Error during export."""
@@ -29,6 +60,7 @@ class ExportProgress:
         self.status = "pending"
         self.error: Optional[str] = None
         self.output_file: Optional[str] = None
+        self.history: Optional[ExportHistory] = None
 
     @property
     def progress_percent(self) -> float:
@@ -51,12 +83,32 @@ class ExportProgress:
 class Exporter:
     """Generates timelapse videos from captured images."""
 
-    def __init__(self, captures_path: Path, exports_path: Path):
+    def __init__(
+        self,
+        captures_path: Path,
+        exports_path: Path,
+        capture_index: Optional[CaptureIndex] = None,
+        max_workers: int = 2
+    ):
         self.captures_path = Path(captures_path)
         self.exports_path = Path(exports_path)
         self.exports_path.mkdir(parents=True, exist_ok=True)
+        self.exports_root = self.exports_path.resolve()
+        # Without a shared index, build a private one from the disk
+        self._owns_index = capture_index is None
+        if capture_index is None:
+            capture_index = CaptureIndex(self.captures_path)
+            capture_index.reconcile()
+        self.capture_index = capture_index
         self._active_exports: dict[str, ExportProgress] = {}
 
+        # Background exports; finished ones are kept a while for status polling
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="export"
+        )
+        self._finished_exports: OrderedDict[str, ExportProgress] = OrderedDict()
+        self._progress_lock = threading.Lock()
+
     def generate_timelapse(
         self,
         camera: str,
@@ -78,14 +130,91 @@ class Exporter:
         Returns:
             ExportHistory with details of the generated video
         """
-        export_id = str(uuid.uuid4())[:8]
+        images, progress = self._prepare_export(camera, start_date, end_date)
+        return self._generate(
+            camera, start_date, end_date, preset, images, progress, output_name
+        )
+
+    def start_timelapse(
+        self,
+        camera: str,
+        start_date: datetime,
+        end_date: datetime,
+        preset: ExportPreset,
+        on_complete: Optional[Callable[[ExportHistory], None]] = None
+    ) -> str:
+        """
+        Queue a timelapse for generation in the background.
+
+        Args:
+            camera: Camera name
+            start_date: Start date for captures
+            end_date: End date for captures
+            preset: Export preset configuration
+            on_complete: Called from the worker thread with the finished export
+
+        Returns:
+            Export ID to pass to get_export_progress
+        """
+        images, progress = self._prepare_export(camera, start_date, end_date)
+        self._executor.submit(
+            self._run_background_export,
+            camera, start_date, end_date, preset, images, progress, on_complete
+        )
+        return progress.export_id
+
+    def _prepare_export(
+        self,
+        camera: str,
+        start_date: datetime,
+        end_date: datetime
+    ) -> tuple[list[Path], ExportProgress]:
+        """Find an export's images and register its progress."""
         images = self._get_images_in_range(camera, start_date, end_date)
 
         if not images:
             raise ExportError(f"No images found for {camera} in the specified date range")
 
-        progress = ExportProgress(export_id, len(images))
-        self._active_exports[export_id] = progress
+        progress = ExportProgress(str(uuid.uuid4())[:8], len(images))
+        with self._progress_lock:
+            self._active_exports[progress.export_id] = progress
+        return images, progress
+
+    def _run_background_export(
+        self,
+        camera: str,
+        start_date: datetime,
+        end_date: datetime,
+        preset: ExportPreset,
+        images: list[Path],
+        progress: ExportProgress,
+        on_complete: Optional[Callable[[ExportHistory], None]]
+    ) -> None:
+        """Worker entry point for start_timelapse."""
+        try:
+            history = self._generate(camera, start_date, end_date, preset, images, progress)
+        except ExportError:
+            # Already logged and recorded on the progress
+            return
+
+        if on_complete:
+            try:
+                on_complete(history)
+            except Exception as e:
+                logger.error(f"Failed to record export {history.id}: {e}")
+
+    def _generate(
+        self,
+        camera: str,
+        start_date: datetime,
+        end_date: datetime,
+        preset: ExportPreset,
+        images: list[Path],
+        progress: ExportProgress,
+        output_name: Optional[str] = None
+    ) -> ExportHistory:
+        """Encode the images and build the history entry."""
+        export_id = progress.export_id
 
         try:
             progress.status = "processing"
@@ -98,13 +227,10 @@ class Exporter:
 
             output_path = self.exports_path / output_name
 
-            self._run_ffmpeg(images, output_path, preset, progress)
-
-            progress.status = "completed"
-            progress.output_file = str(output_path)
+            image_count = self._run_ffmpeg(images, output_path, preset, progress)
 
             file_size = output_path.stat().st_size
-            duration = len(images) / preset.fps
+            duration = image_count / preset.fps
 
             history = ExportHistory(
                 id=export_id,
@@ -114,14 +240,18 @@ class Exporter:
                 preset=preset.name,
                 output_file=output_name,
                 created_at=datetime.now().isoformat(),
-                image_count=len(images),
+                image_count=image_count,
                 duration_seconds=duration,
                 file_size_bytes=file_size
             )
 
+            progress.history = history
+            progress.output_file = str(output_path)
+            progress.status = "completed"
+
             logger.info(
                 f"Generated timelapse: {output_name} "
-                f"({len(images)} images, {duration:.1f}s, {file_size / 1024 / 1024:.1f}MB)"
+                f"({image_count} images, {duration:.1f}s, {file_size / 1024 / 1024:.1f}MB)"
             )
 
             return history
@@ -133,8 +263,15 @@ class Exporter:
             raise ExportError(str(e))
 
         finally:
-            if export_id in self._active_exports:
-                del self._active_exports[export_id]
+            with self._progress_lock:
+                self._retire_progress(progress)
+
+    def _retire_progress(self, progress: ExportProgress) -> None:
+        """Move an export's progress to the finished list. Caller holds _progress_lock."""
+        self._active_exports.pop(progress.export_id, None)
+        self._finished_exports[progress.export_id] = progress
+        if len(self._finished_exports) > FINISHED_EXPORTS_KEPT:
+            self._finished_exports.popitem(last=False)
 
     def _get_images_in_range(
         self,
@@ -143,26 +280,10 @@ class Exporter:
         end_date: datetime
     ) -> list[Path]:
         """Get sorted list of images within date range."""
-        camera_dir = self.captures_path / camera
-
-        if not camera_dir.exists():
-            return []
-
-        images = []
-
-        for img_path in camera_dir.rglob("*.jpg"):
-            try:
-                filename = img_path.stem
-                date_str = "_".join(filename.split("_")[1:])
-                capture_time = datetime.strptime(date_str, "%Y-%m-%d_%H-%M-%S")
-
-                if start_date <= capture_time <= end_date:
-                    images.append(img_path)
-            except ValueError:
-                continue
-
-        images.sort(key=lambda p: p.name)
-        return images
+        return [
+            self.captures_path / rel_path
+            for rel_path in self.capture_index.captures_for_camera(camera, start_date, end_date)
+        ]
 
     def _run_ffmpeg(
         self,
@@ -170,59 +291,139 @@ class Exporter:
         output_path: Path,
         preset: ExportPreset,
         progress: ExportProgress
-    ) -> None:
-        """Run FFmpeg to generate the timelapse."""
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.txt', delete=False) as f:
-            for img in images:
-                escaped_path = str(img).replace("'", "'\\''")
-                f.write(f"file '{escaped_path}'\n")
-            file_list_path = f.name
-
-        try:
-            cmd = [
-                "ffmpeg",
-                "-y",
-                "-f", "concat",
-                "-safe", "0",
-                "-i", file_list_path,
-                "-framerate", str(preset.fps),
-                "-c:v", preset.codec,
-                "-pix_fmt", preset.pixel_format,
-                "-preset", preset.ffmpeg_preset,
-            ]
+    ) -> int:
+        """Run FFmpeg to generate the timelapse, returning the number of frames written."""
+        hw_encoder = None
+        if preset.hwaccel_encoder:
+            hw_encoder = HW_ENCODERS.get(preset.hwaccel_encoder)
+            if hw_encoder is None:
+                logger.warning(
+                    f"No tuning known for encoder '{preset.hwaccel_encoder}', "
+                    f"using FFmpeg defaults"
+                )
+                hw_encoder = {"args": []}
+
+        cmd = ["ffmpeg", "-y"]
+        if hw_encoder:
+            cmd.extend(hw_encoder.get("global_args", []))
+
+        cmd.extend([
+            "-f", "image2pipe",
+            "-framerate", str(preset.fps),
+            "-c:v", "mjpeg",
+            "-i", "-",
+            "-c:v", preset.hwaccel_encoder or preset.codec,
+        ])
+
+        scale = preset.width and preset.height
+        filters = []
+        frames_on_gpu = bool(
+            hw_encoder
+            and "upload" in hw_encoder
+            and (scale or hw_encoder.get("always_upload"))
+        )
+
+        if frames_on_gpu:
+            filters.append(hw_encoder["upload"])
+            if scale:
+                filters.append(
+                    hw_encoder["scale"].format(width=preset.width, height=preset.height)
+                )
+        elif scale:
+            filters.append(f"scale={preset.width}:{preset.height}")
 
-            if preset.width and preset.height:
-                cmd.extend(["-vf", f"scale={preset.width}:{preset.height}"])
+        if filters:
+            cmd.extend(["-vf", ",".join(filters)])
 
-            # Enable faststart for web streaming (moves moov atom to beginning)
-            cmd.extend(["-movflags", "+faststart"])
+        # Frames uploaded to the GPU keep the encoder's native pixel format
+        if not frames_on_gpu:
+            cmd.extend(["-pix_fmt", preset.pixel_format])
 
-            cmd.append(str(output_path))
+        if hw_encoder:
+            cmd.extend(hw_encoder["args"])
+        else:
+            cmd.extend(["-preset", preset.ffmpeg_preset])
 
-            logger.debug(f"Running FFmpeg: {' '.join(cmd)}")
+        # Enable faststart for web streaming (moves moov atom to beginning)
+        cmd.extend(["-movflags", "+faststart"])
 
-            process = subprocess.Popen(
-                cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                universal_newlines=True
-            )
+        cmd.append(str(output_path))
 
-            _, stderr = process.communicate()
+        logger.debug(f"Running FFmpeg: {' '.join(cmd)}")
 
-            if process.returncode != 0:
-                raise ExportError(f"FFmpeg failed: {stderr}")
+        process = subprocess.Popen(
+            cmd,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE
+        )
 
-            progress.current_frame = len(images)
+        # Drain stderr concurrently so FFmpeg never blocks on a full pipe
+        stderr_chunks: list[bytes] = []
+        stderr_reader = threading.Thread(
+            target=lambda: stderr_chunks.append(process.stderr.read()),
+            daemon=True
+        )
+        stderr_reader.start()
 
+        missing = []
+        try:
+            for img in images:
+                try:
+                    with open(img, "rb") as f:
+                        shutil.copyfileobj(f, process.stdin, 1 << 20)
+                except FileNotFoundError:
+                    # Deleted since the index was read, e.g. by a manual prune
+                    missing.append(img)
+                progress.current_frame += 1
+        except BrokenPipeError:
+            # FFmpeg exited early; its stderr explains why
+            pass
         finally:
-            os.unlink(file_list_path)
+            try:
+                process.stdin.close()
+            except BrokenPipeError:
+                pass
+            process.wait()
+            stderr_reader.join()
+
+        if missing:
+            logger.warning(f"Skipped {len(missing)} capture files that no longer exist")
+            self.capture_index.remove(missing)
+
+        if process.returncode != 0:
+            stderr = b"".join(stderr_chunks).decode(errors="replace")
+            raise ExportError(f"FFmpeg failed: {stderr}")
+
+        return len(images) - len(missing)
 
     def get_export_progress(self, export_id: str) -> Optional[dict]:
-        """Get progress of an active export."""
-        if export_id in self._active_exports:
-            return self._active_exports[export_id].to_dict()
-        return None
+        """Get progress of an active or recently finished export."""
+        progress = self.get_progress(export_id)
+        return progress.to_dict() if progress else None
+
+    def get_progress(self, export_id: str) -> Optional[ExportProgress]:
+        """Get the progress tracker of an active or recently finished export."""
+        with self._progress_lock:
+            return (
+                self._active_exports.get(export_id)
+                or self._finished_exports.get(export_id)
+            )
+
+    def close(self) -> None:
+        """Wait for running exports, cancel queued ones and stop the worker pool."""
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+        # Exports still pending were cancelled before they started
+        with self._progress_lock:
+            for progress in list(self._active_exports.values()):
+                if progress.status == "pending":
+                    progress.status = "failed"
+                    progress.error = "cancelled at shutdown"
+                    self._retire_progress(progress)
+
+        if self._owns_index:
+            self.capture_index.close()
 
     def calculate_export_info(
         self,
@@ -264,8 +465,8 @@ class Exporter:
         total_size = 0
         total_files = 0
 
-        for export_file in self.exports_path.glob("*.mp4"):
-            total_size += export_file.stat().st_size
+        for entry in self._export_entries():
+            total_size += entry.stat().st_size
             total_files += 1
 
         return {
@@ -275,18 +476,25 @@ class Exporter:
 
     def list_exports(self) -> list[dict]:
         """List all export files."""
-        exports = []
+        entries = [(entry, entry.stat()) for entry in self._export_entries()]
+        entries.sort(key=lambda item: item[1].st_mtime_ns, reverse=True)
 
-        for export_file in self.exports_path.glob("*.mp4"):
-            stat = export_file.stat()
-            exports.append({
-                "filename": export_file.name,
+        return [
+            {
+                "filename": entry.name,
                 "size_bytes": stat.st_size,
                 "created_at": datetime.fromtimestamp(stat.st_mtime).isoformat()
-            })
-
-        exports.sort(key=lambda x: x["created_at"], reverse=True)
-        return exports
+            }
+            for entry, stat in entries
+        ]
+
+    def _export_entries(self) -> list[os.DirEntry]:
+        """Get directory entries of the export files."""
+        with os.scandir(self.exports_path) as it:
+            return [
+                entry for entry in it
+                if entry.name.endswith(".mp4") and entry.is_file()
+            ]
 
     def delete_export(self, filename: str) -> bool:
         """Delete an export file."""
@@ -295,7 +503,7 @@ class Exporter:
         if not export_path.exists():
             return False
 
-        if not str(export_path.resolve()).startswith(str(self.exports_path.resolve())):
+        if not export_path.resolve().is_relative_to(self.exports_root):
             raise ExportError("Invalid export path")
 
         export_path.unlink()
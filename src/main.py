@@ -1,17 +1,29 @@
 """Main entry point for RTSP Timelapse Generator."""
 
 import argparse
+import atexit
 import logging
+import os
+import queue
+import select
 import signal
+import socket
 import sys
 import threading
+import time
 from pathlib import Path
-from logging.handlers import RotatingFileHandler
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 
-from watchdog.observers import Observer
+from watchdog.observers.polling import PollingObserver
 from watchdog.events import FileSystemEventHandler
 
-from .config import get_config, reload_config, ConfigManager
+# Production WSGI server with a bounded thread pool; Flask's dev server is the fallback
+try:
+    from waitress import serve as waitress_serve
+except ImportError:
+    waitress_serve = None
+
+from .config import get_config, ConfigManager
 from .capture import CaptureManager
 from .scheduler import ScheduleManager
 from .exporter import Exporter
@@ -24,34 +36,78 @@ config_manager: ConfigManager = None
 capture_manager: CaptureManager = None
 schedule_manager: ScheduleManager = None
 exporter: Exporter = None
-config_observer: Observer = None
-shutdown_event = threading.Event()
+config_observer: PollingObserver = None
+_log_listener: QueueListener = None
+
+# Self-pipe: signal handlers write a byte and main() parks in select() until then
+_shutdown_r, _shutdown_w = socket.socketpair()
+_shutdown_r.setblocking(False)
+_shutdown_w.setblocking(False)
 
 
 class ConfigFileHandler(FileSystemEventHandler):
     """Handles config file changes for hot-reload."""
 
+    DEBOUNCE_SECONDS = 0.3
+
     def __init__(self, callback):
         self.callback = callback
-        self._debounce_timer = None
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._deadline = 0.0
+        self._pending_path = None
+
+        # One long-lived thread coalesces bursts of events into a single reload
+        self._thread = threading.Thread(target=self._debounce_loop, daemon=True)
+        self._thread.start()
 
     def on_modified(self, event):
         if event.is_directory:
             return
 
-        if event.src_path.endswith('.yaml'):
-            if self._debounce_timer:
-                self._debounce_timer.cancel()
-            self._debounce_timer = threading.Timer(1.0, self._trigger_reload, [event.src_path])
-            self._debounce_timer.start()
+        path = event.src_path
+        name = os.path.basename(path)
+        if name.startswith('.') or not name.endswith(('.yaml', '.yml')):
+            return
+
+        with self._lock:
+            self._deadline = time.monotonic() + self.DEBOUNCE_SECONDS
+            self._pending_path = path
+        self._wake.set()
+
+    def _debounce_loop(self):
+        while True:
+            self._wake.wait()
+
+            while True:
+                with self._lock:
+                    remaining = self._deadline - time.monotonic()
+                    if remaining <= 0:
+                        path = self._pending_path
+                        self._wake.clear()
+                        break
+                time.sleep(remaining)
+
+            self._trigger_reload(path)
 
     def _trigger_reload(self, path):
         logger.info(f"Config file changed: {path}")
         self.callback()
 
 
+@atexit.register
+def stop_log_listener() -> None:
+    """Flush queued log records and stop the listener thread."""
+    global _log_listener
+    if _log_listener:
+        _log_listener.stop()
+        _log_listener = None
+
+
 def setup_logging(config: ConfigManager) -> None:
     """Configure logging."""
+    global _log_listener
+
     logs_path = config.get_logs_path()
     logs_path.mkdir(parents=True, exist_ok=True)
 
@@ -71,7 +127,6 @@ def setup_logging(config: ConfigManager) -> None:
         datefmt='%Y-%m-%d %H:%M:%S'
     )
     console_handler.setFormatter(console_format)
-    root_logger.addHandler(console_handler)
 
     max_bytes = config.app_config.storage.max_log_size_mb * 1024 * 1024
     file_handler = RotatingFileHandler(
@@ -85,7 +140,16 @@ def setup_logging(config: ConfigManager) -> None:
         datefmt='%Y-%m-%d %H:%M:%S'
     )
     file_handler.setFormatter(file_format)
-    root_logger.addHandler(file_handler)
+
+    # Handlers run on the listener thread, so callers never block on disk writes
+    stop_log_listener()
+
+    log_queue = queue.SimpleQueue()
+    root_logger.addHandler(QueueHandler(log_queue))
+    _log_listener = QueueListener(
+        log_queue, console_handler, file_handler, respect_handler_level=True
+    )
+    _log_listener.start()
 
     logger.info(f"Logging configured: level={config.app_config.log_level}, file={log_file}")
 
@@ -99,26 +163,28 @@ def capture_callback(camera) -> None:
 
 def handle_config_reload() -> None:
     """Handle configuration reload."""
-    global config_manager, schedule_manager
-
     try:
-        old_cameras = dict(config_manager.cameras)
+        old_digests = config_manager.camera_digests
+
+        config_manager.load_all()
 
-        reload_config()
-        config_manager = get_config()
+        new_digests = config_manager.camera_digests
+        if new_digests == old_digests:
+            logger.debug("Camera configuration unchanged")
+            return
 
-        new_cameras = config_manager.cameras
-        for name in list(old_cameras.keys()):
-            if name not in new_cameras:
-                schedule_manager.remove_camera(name)
-                logger.info(f"Removed camera: {name}")
+        for name in old_digests.keys() - new_digests.keys():
+            schedule_manager.remove_camera(name)
+            logger.info(f"Removed camera: {name}")
 
-        for name, camera in new_cameras.items():
-            if name not in old_cameras:
-                schedule_manager.update_camera(camera)
+        for name, digest in new_digests.items():
+            old_digest = old_digests.get(name)
+            if old_digest == digest:
+                continue
+            schedule_manager.update_camera(config_manager.cameras[name])
+            if old_digest is None:
                 logger.info(f"Added camera: {name}")
-            elif camera != old_cameras[name]:
-                schedule_manager.update_camera(camera)
+            else:
                 logger.info(f"Updated camera: {name}")
 
         logger.info("Configuration reloaded successfully")
@@ -130,12 +196,69 @@ def handle_config_reload() -> None:
 def signal_handler(signum, frame) -> None:
     """Handle shutdown signals."""
     logger.info(f"Received signal {signum}, shutting down...")
-    shutdown_event.set()
+    try:
+        _shutdown_w.send(b"x")
+    except BlockingIOError:
+        # Buffer already holds a wake-up byte
+        pass
+
+
+def start_services() -> None:
+    """Start capture, export, scheduling and config watching for config_manager."""
+    global capture_manager, schedule_manager, exporter, config_observer
+
+    captures_path = config_manager.get_captures_path()
+    exports_path = config_manager.get_exports_path()
+
+    captures_path.mkdir(parents=True, exist_ok=True)
+    exports_path.mkdir(parents=True, exist_ok=True)
+
+    rescan_minutes = config_manager.app_config.storage.index_rescan_minutes
+    capture_manager = CaptureManager(
+        captures_path,
+        reconcile_interval=rescan_minutes * 60 if rescan_minutes else None,
+        index_path=config_manager.get_index_path()
+    )
+    exporter = Exporter(captures_path, exports_path, capture_manager.index)
+    schedule_manager = ScheduleManager()
+
+    schedule_manager.set_capture_callback(capture_callback)
+    schedule_manager.load_cameras(config_manager.cameras)
+    schedule_manager.start()
+
+    logger.info(f"Loaded {len(config_manager.cameras)} cameras")
+
+    event_handler = ConfigFileHandler(handle_config_reload)
+    # The config dir changes a few times a day at most, so a slow stat
+    # poll is cheaper than keeping native watches and a busy thread
+    config_observer = PollingObserver(timeout=5.0)
+    config_observer.schedule(event_handler, str(config_manager.config_dir), recursive=False)
+    config_observer.start()
+    logger.info("Config hot-reload enabled")
+
+
+def stop_services() -> None:
+    """Stop everything start_services started."""
+    if config_observer:
+        config_observer.stop()
+        config_observer.join()
+
+    if schedule_manager:
+        schedule_manager.stop()
+
+    if config_manager:
+        config_manager.flush_cameras_save()
+
+    if exporter:
+        exporter.close()
+
+    if capture_manager:
+        capture_manager.close()
 
 
 def main() -> int:
     """Main entry point."""
-    global config_manager, capture_manager, schedule_manager, exporter, config_observer
+    global config_manager
 
     parser = argparse.ArgumentParser(description='RTSP Timelapse Generator')
     parser.add_argument(
@@ -163,27 +286,7 @@ def main() -> int:
 
         logger.info("Starting RTSP Timelapse Generator")
 
-        captures_path = config_manager.get_captures_path()
-        exports_path = config_manager.get_exports_path()
-
-        captures_path.mkdir(parents=True, exist_ok=True)
-        exports_path.mkdir(parents=True, exist_ok=True)
-
-        capture_manager = CaptureManager(captures_path)
-        exporter = Exporter(captures_path, exports_path)
-        schedule_manager = ScheduleManager()
-
-        schedule_manager.set_capture_callback(capture_callback)
-        schedule_manager.load_cameras(config_manager.cameras)
-        schedule_manager.start()
-
-        logger.info(f"Loaded {len(config_manager.cameras)} cameras")
-
-        event_handler = ConfigFileHandler(handle_config_reload)
-        config_observer = Observer()
-        config_observer.schedule(event_handler, str(config_manager.config_dir), recursive=False)
-        config_observer.start()
-        logger.info("Config hot-reload enabled")
+        start_services()
 
         signal.signal(signal.SIGTERM, signal_handler)
         signal.signal(signal.SIGINT, signal_handler)
@@ -207,21 +310,23 @@ def main() -> int:
             logger.info(f"Starting web UI at http://{host}:{port}")
 
             def run_flask():
-                app.run(
-                    host=host,
-                    port=port,
-                    debug=False,
-                    use_reloader=False,
-                    threaded=True
-                )
+                if waitress_serve:
+                    waitress_serve(app, host=host, port=port, threads=8, ident=None)
+                else:
+                    app.run(
+                        host=host,
+                        port=port,
+                        debug=False,
+                        use_reloader=False,
+                        threaded=True
+                    )
 
             flask_thread = threading.Thread(target=run_flask, daemon=True)
             flask_thread.start()
 
         logger.info("Application started. Press Ctrl+C to stop.")
 
-        while not shutdown_event.is_set():
-            shutdown_event.wait(timeout=1.0)
+        select.select([_shutdown_r], [], [])
 
     except KeyboardInterrupt:
         logger.info("Keyboard interrupt received")
@@ -233,12 +338,10 @@ def main() -> int:
     finally:
         logger.info("Shutting down...")
 
-        if config_observer:
-            config_observer.stop()
-            config_observer.join()
+        stop_services()
 
-        if schedule_manager:
-            schedule_manager.stop()
+        _shutdown_r.close()
+        _shutdown_w.close()
 
         logger.info("Shutdown complete")
 
@@ -1,11 +1,63 @@
 """Data models for RTSP Timelapse Generator."""
 
-from dataclasses import dataclass, field
+import hashlib
+import sys
+from dataclasses import MISSING, astuple, dataclass, field, fields
 from datetime import time
-from typing import Optional
+from time import localtime
+from typing import Optional, get_type_hints
 from enum import Enum
 
 
+def _dict_constructor(*fixed: str):
+    """Class decorator compiling a ``from_dict`` classmethod for a flat dataclass.
+
+    The generated code is one ``data.get(key, default)`` per field, as a
+    hand-written from_dict would be, with defaults taken from the fields
+    themselves and default factories called per instance. Names in ``fixed``
+    become positional arguments instead, and required fields fall back to
+    their type's empty value, e.g. "" or 0.
+    """
+    def decorate(cls):
+        # Resolves string annotations, e.g. under "from __future__ import annotations"
+        hints = get_type_hints(cls)
+        namespace = {}
+        args = []
+        for f in fields(cls):
+            if not f.init:
+                continue
+            if f.name in fixed:
+                args.append(f"{f.name}={f.name}")
+                continue
+
+            default = f"_d_{f.name}"
+            if f.default is not MISSING:
+                namespace[default] = f.default
+                args.append(f"{f.name}=get({f.name!r}, {default})")
+            elif f.default_factory is not MISSING:
+                namespace[default] = f.default_factory
+                args.append(f"{f.name}=data[{f.name!r}] if {f.name!r} in data else {default}()")
+            else:
+                field_type = hints[f.name]
+                if not isinstance(field_type, type):
+                    raise TypeError(
+                        f"{cls.__name__}.{f.name} needs a default to be built by from_dict"
+                    )
+                namespace[default] = field_type()
+                args.append(f"{f.name}=get({f.name!r}, {default})")
+
+        source = (
+            f"def from_dict(cls, {''.join(name + ', ' for name in fixed)}data):\n"
+            f"    get = data.get\n"
+            f"    return cls({', '.join(args)})\n"
+        )
+        exec(source, namespace)
+        cls.from_dict = classmethod(namespace["from_dict"])
+        return cls
+
+    return decorate
+
+
 class FrequencyType(Enum):
     """Schedule frequency types."""
     HOURLY = "hourly"
@@ -13,12 +65,36 @@ class FrequencyType(Enum):
     X_PER_DAY = "x_per_day"
 
 
-@dataclass
+# Plain dict lookup; calling the Enum goes through EnumMeta.__call__ every time
+_FREQUENCIES = {frequency.value: frequency for frequency in FrequencyType}
+
+
+@dataclass(frozen=True, slots=True)
 class TimeWindow:
     """Time window for schedule execution."""
     start: time = field(default_factory=lambda: time(0, 0))
     end: time = field(default_factory=lambda: time(23, 59))
 
+    # Minutes from midnight, derived from start and end
+    start_minute: int = field(init=False, repr=False, compare=False)
+    end_minute: int = field(init=False, repr=False, compare=False)
+    wrap: bool = field(init=False, repr=False, compare=False)  # window spans midnight
+
+    def __post_init__(self):
+        start_minute = self.start.hour * 60 + self.start.minute
+        end_minute = self.end.hour * 60 + self.end.minute
+        object.__setattr__(self, "start_minute", start_minute)
+        object.__setattr__(self, "end_minute", end_minute)
+        object.__setattr__(self, "wrap", end_minute < start_minute)
+
+    def contains_now(self) -> bool:
+        """Check if the current local time falls within the window."""
+        tm = localtime()
+        now_minute = tm.tm_hour * 60 + tm.tm_min
+        if self.wrap:
+            return now_minute >= self.start_minute or now_minute <= self.end_minute
+        return self.start_minute <= now_minute <= self.end_minute
+
     @classmethod
     def from_dict(cls, data: Optional[dict]) -> Optional["TimeWindow"]:
         if data is None:
@@ -29,7 +105,7 @@ class TimeWindow:
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class Schedule:
     """Capture schedule configuration."""
     name: str
@@ -40,16 +116,18 @@ class Schedule:
 
     @classmethod
     def from_dict(cls, data: dict) -> "Schedule":
+        frequency = data.get("frequency", "hourly")
         return cls(
-            name=data.get("name", "default"),
-            frequency=FrequencyType(data.get("frequency", "hourly")),
+            name=sys.intern(data.get("name", "default")),
+            frequency=_FREQUENCIES.get(frequency) or FrequencyType(frequency),
             enabled=data.get("enabled", True),
             value=data.get("value", 1),
             time_window=TimeWindow.from_dict(data.get("time_window"))
         )
 
 
-@dataclass
+@_dict_constructor()
+@dataclass(frozen=True, slots=True)
 class CaptureSettings:
     """Settings for image capture."""
     jpeg_quality: int = 90
@@ -57,9 +135,12 @@ class CaptureSettings:
     timeout_seconds: int = 10
     retry_count: int = 3
     retry_delay_seconds: float = 1.0
+    prewarm_frames: int = 3  # Frames grabbed before the one that is kept
+    hwaccel: Optional[str] = None  # any, vaapi, d3d11 or mfx; None means software decode
+    backend: str = "opencv"  # opencv, or ffmpeg to grab frames with the ffmpeg CLI
 
 
-@dataclass
+@dataclass(slots=True)
 class CameraConfig:
     """Camera configuration."""
     name: str
@@ -72,25 +153,24 @@ class CameraConfig:
     def from_dict(cls, name: str, data: dict) -> "CameraConfig":
         schedules = [Schedule.from_dict(s) for s in data.get("schedules", [])]
 
-        capture_data = data.get("capture_settings", {})
-        capture_settings = CaptureSettings(
-            jpeg_quality=capture_data.get("jpeg_quality", 90),
-            resolution_scale=capture_data.get("resolution_scale"),
-            timeout_seconds=capture_data.get("timeout_seconds", 10),
-            retry_count=capture_data.get("retry_count", 3),
-            retry_delay_seconds=capture_data.get("retry_delay_seconds", 1.0)
-        )
+        capture_settings = CaptureSettings.from_dict(data.get("capture_settings", {}))
 
         return cls(
-            name=name,
+            # Interned, since names key the scheduler's dicts and job IDs
+            name=sys.intern(name),
             url=data.get("url", ""),
             enabled=data.get("enabled", True),
             schedules=schedules,
             capture_settings=capture_settings
         )
 
+    def content_hash(self) -> bytes:
+        """Get a short digest of the full configuration, for cheap change detection."""
+        return hashlib.blake2b(repr(astuple(self)).encode(), digest_size=8).digest()
+
 
-@dataclass
+@_dict_constructor("name")
+@dataclass(frozen=True, slots=True)
 class ExportPreset:
     """Export preset configuration."""
     name: str
@@ -100,21 +180,11 @@ class ExportPreset:
     codec: str = "libx264"
     ffmpeg_preset: str = "medium"
     pixel_format: str = "yuv420p"
-
-    @classmethod
-    def from_dict(cls, name: str, data: dict) -> "ExportPreset":
-        return cls(
-            name=name,
-            fps=data.get("fps", 30),
-            width=data.get("width"),
-            height=data.get("height"),
-            codec=data.get("codec", "libx264"),
-            ffmpeg_preset=data.get("ffmpeg_preset", "medium"),
-            pixel_format=data.get("pixel_format", "yuv420p")
-        )
+    hwaccel_encoder: Optional[str] = None  # e.g. h264_nvenc; replaces codec when set
 
 
-@dataclass
+@_dict_constructor()
+@dataclass(frozen=True, slots=True)
 class WebUIConfig:
     """Web UI configuration."""
     enabled: bool = True
@@ -123,18 +193,24 @@ class WebUIConfig:
     auth_enabled: bool = False
     username: str = "admin"
     password: str = "admin"
+    # Hand file downloads to the front-end server instead of reading them in Python
+    x_sendfile: bool = False  # X-Sendfile, for Apache mod_xsendfile or uWSGI
+    x_accel_redirect: Optional[str] = None  # nginx internal location prefix, e.g. /protected
 
 
-@dataclass
+@_dict_constructor()
+@dataclass(frozen=True, slots=True)
 class StorageConfig:
     """Storage configuration."""
     captures_path: str = "captures"
     exports_path: str = "exports"
     logs_path: str = "logs"
     max_log_size_mb: int = 100
+    index_path: Optional[str] = None  # Capture index database; defaults to the config dir
+    index_rescan_minutes: Optional[int] = None  # Periodic full rescan of captures; off by default
 
 
-@dataclass
+@dataclass(slots=True)
 class AppConfig:
     """Application configuration."""
     web_ui: WebUIConfig = field(default_factory=WebUIConfig)
@@ -143,23 +219,8 @@ class AppConfig:
 
     @classmethod
     def from_dict(cls, data: dict) -> "AppConfig":
-        web_ui_data = data.get("web_ui", {})
-        web_ui = WebUIConfig(
-            enabled=web_ui_data.get("enabled", True),
-            host=web_ui_data.get("host", "0.0.0.0"),
-            port=web_ui_data.get("port", 5000),
-            auth_enabled=web_ui_data.get("auth_enabled", False),
-            username=web_ui_data.get("username", "admin"),
-            password=web_ui_data.get("password", "admin")
-        )
-
-        storage_data = data.get("storage", {})
-        storage = StorageConfig(
-            captures_path=storage_data.get("captures_path", "captures"),
-            exports_path=storage_data.get("exports_path", "exports"),
-            logs_path=storage_data.get("logs_path", "logs"),
-            max_log_size_mb=storage_data.get("max_log_size_mb", 100)
-        )
+        web_ui = WebUIConfig.from_dict(data.get("web_ui", {}))
+        storage = StorageConfig.from_dict(data.get("storage", {}))
 
         return cls(
             web_ui=web_ui,
@@ -168,7 +229,8 @@ class AppConfig:
         )
 
 
-@dataclass
+@_dict_constructor()
+@dataclass(slots=True)
 class PendingExport:
     """Pending export job."""
     id: str
@@ -178,19 +240,9 @@ class PendingExport:
     preset: str = "standard"
     auto_generate: bool = False
 
-    @classmethod
-    def from_dict(cls, data: dict) -> "PendingExport":
-        return cls(
-            id=data.get("id", ""),
-            camera=data.get("camera", ""),
-            start_date=data.get("start_date", ""),
-            end_date=data.get("end_date", ""),
-            preset=data.get("preset", "standard"),
-            auto_generate=data.get("auto_generate", False)
-        )
-
 
-@dataclass
+@_dict_constructor()
+@dataclass(slots=True)
 class ExportHistory:
     """Export history entry."""
     id: str
@@ -203,18 +255,3 @@ class ExportHistory:
     image_count: int
     duration_seconds: float
     file_size_bytes: int
-
-    @classmethod
-    def from_dict(cls, data: dict) -> "ExportHistory":
-        return cls(
-            id=data.get("id", ""),
-            camera=data.get("camera", ""),
-            start_date=data.get("start_date", ""),
-            end_date=data.get("end_date", ""),
-            preset=data.get("preset", ""),
-            output_file=data.get("output_file", ""),
-            created_at=data.get("created_at", ""),
-            image_count=data.get("image_count", 0),
-            duration_seconds=data.get("duration_seconds", 0.0),
-            file_size_bytes=data.get("file_size_bytes", 0)
-        )
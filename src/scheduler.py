@@ -1,8 +1,9 @@
 """Schedule management for RTSP captures."""
 
+import copy
 import logging
-from datetime import datetime, time, timedelta
-from typing import Callable, Optional
+import sys
+from typing import Callable, Iterable, Iterator, Optional
 
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
@@ -21,6 +22,10 @@ class ScheduleManager:
         self._capture_callback: Optional[Callable[[CameraConfig], None]] = None
         self._cameras: dict[str, CameraConfig] = {}
         self._job_ids: dict[str, list[str]] = {}  # camera_name -> list of job IDs
+        # camera_name -> (schedule as installed, its job IDs), for diffing updates
+        self._schedule_jobs: dict[str, list[tuple[Schedule, list[str]]]] = {}
+        # Cron triggers are immutable, so jobs with the same fields share one
+        self._trigger_cache: dict[tuple, CronTrigger] = {}
 
     def set_capture_callback(self, callback: Callable[[CameraConfig], None]) -> None:
         """Set the callback function for capture jobs."""
@@ -37,25 +42,66 @@ class ScheduleManager:
         if self.scheduler.running:
             self.scheduler.shutdown(wait=True)
             logger.info("Scheduler stopped")
+        self._trigger_cache.clear()
 
     def load_cameras(self, cameras: dict[str, CameraConfig]) -> None:
         """Load cameras and their schedules."""
-        self._cameras = cameras
-
-        for camera_name, camera in cameras.items():
-            if camera.enabled:
-                self._add_camera_schedules(camera)
-
-    def _add_camera_schedules(self, camera: CameraConfig) -> None:
-        """Add all schedules for a camera."""
-        self._job_ids[camera.name] = []
+        # Own copy, so remove_camera doesn't delete from the caller's dict
+        self._cameras = dict(cameras)
+
+        # Before start() jobs are only queued; once running, pause so the
+        # scheduler recomputes its next wakeup once rather than per add_job
+        running = self.scheduler.running
+        if running:
+            self.scheduler.pause()
+
+        try:
+            for camera in cameras.values():
+                self._sync_camera_schedules(camera)
+        finally:
+            if running:
+                self.scheduler.resume()
+
+    def _sync_camera_schedules(self, camera: CameraConfig) -> None:
+        """Add and remove jobs so only the camera's changed schedules are touched."""
+        active = [s for s in camera.schedules if s.enabled] if camera.enabled else []
+        installed = self._schedule_jobs.pop(camera.name, [])
+
+        kept = []
+        for schedule, job_ids in installed:
+            if schedule in active:
+                kept.append((schedule, job_ids))
+            else:
+                self._remove_jobs(job_ids)
+
+        # Removals go first, since a changed schedule reuses its job IDs
+        installed_schedules = [schedule for schedule, _ in kept]
+        for schedule in active:
+            if schedule not in installed_schedules:
+                job_ids = self._create_schedule_jobs(camera, schedule)
+                # Copy, so later in-place edits to the camera still show up as changes
+                kept.append((copy.copy(schedule), job_ids))
+
+        if kept:
+            self._schedule_jobs[camera.name] = kept
+            self._job_ids[camera.name] = [
+                job_id for _, job_ids in kept for job_id in job_ids
+            ]
+        else:
+            self._job_ids.pop(camera.name, None)
 
-        for schedule in camera.schedules:
-            if not schedule.enabled:
-                continue
+    def _existing_jobs(self, job_ids: Iterable[str]) -> list[str]:
+        """Filter job IDs down to those the scheduler currently has."""
+        existing = {job.id for job in self.scheduler.get_jobs()}
+        return [job_id for job_id in job_ids if job_id in existing]
 
-            job_ids = self._create_schedule_jobs(camera, schedule)
-            self._job_ids[camera.name].extend(job_ids)
+    def _remove_jobs(self, job_ids: Iterable[str]) -> None:
+        """Remove scheduler jobs, skipping ones that are already gone."""
+        job_ids = self._existing_jobs(job_ids)
+        for job_id in job_ids:
+            self.scheduler.remove_job(job_id)
+        if job_ids:
+            logger.info("Removed %d jobs: %s", len(job_ids), ", ".join(job_ids))
 
     def _create_schedule_jobs(
         self,
@@ -80,30 +126,38 @@ class ScheduleManager:
 
         return job_ids
 
+    def _get_cron(self, **fields) -> CronTrigger:
+        """Get a cron trigger for the given fields, parsing each expression only once."""
+        key = tuple(sorted(fields.items()))
+        trigger = self._trigger_cache.get(key)
+        if trigger is None:
+            trigger = self._trigger_cache[key] = CronTrigger(**fields)
+        return trigger
+
     def _create_hourly_job(
         self,
         camera: CameraConfig,
         schedule: Schedule
     ) -> Optional[str]:
         """Create hourly capture job."""
-        job_id = f"{camera.name}_{schedule.name}_hourly"
+        job_id = sys.intern(f"{camera.name}_{schedule.name}_hourly")
 
         trigger_kwargs = {"minute": 0}
 
         if schedule.time_window:
             trigger_kwargs["hour"] = self._get_hour_range(schedule.time_window)
 
-        trigger = CronTrigger(**trigger_kwargs)
+        trigger = self._get_cron(**trigger_kwargs)
 
         self.scheduler.add_job(
             self._execute_capture,
             trigger=trigger,
             id=job_id,
-            args=[camera],
+            args=[camera.name],
             replace_existing=True
         )
 
-        logger.info(f"Added hourly job for {camera.name}: {job_id}")
+        logger.info("Added hourly job for %s: %s", camera.name, job_id)
         return job_id
 
     def _create_interval_job(
@@ -112,7 +166,7 @@ class ScheduleManager:
         schedule: Schedule
     ) -> Optional[str]:
         """Create interval-based capture job."""
-        job_id = f"{camera.name}_{schedule.name}_interval"
+        job_id = sys.intern(f"{camera.name}_{schedule.name}_interval")
 
         trigger = IntervalTrigger(hours=schedule.value)
 
@@ -120,11 +174,13 @@ class ScheduleManager:
             self._execute_capture_with_window_check,
             trigger=trigger,
             id=job_id,
-            args=[camera, schedule.time_window],
+            args=[camera.name, schedule.time_window],
             replace_existing=True
         )
 
-        logger.info(f"Added interval job ({schedule.value}h) for {camera.name}: {job_id}")
+        logger.info(
+            "Added interval job (%sh) for %s: %s", schedule.value, camera.name, job_id
+        )
         return job_id
 
     def _create_x_per_day_jobs(
@@ -134,35 +190,42 @@ class ScheduleManager:
     ) -> list[str]:
         """Create X captures per day distributed across time window."""
         job_ids = []
-        times = self._calculate_distributed_times(schedule.value, schedule.time_window)
+        # One cron trigger per distinct minute, listing every hour it fires in
+        hours_by_minute: dict[int, set[int]] = {}
+        for minutes in self._distribute_minutes(schedule.value, schedule.time_window):
+            hours_by_minute.setdefault(minutes % 60, set()).add((minutes // 60) % 24)
 
-        for i, capture_time in enumerate(times):
-            job_id = f"{camera.name}_{schedule.name}_daily_{i}"
+        for i, (minute, hours) in enumerate(sorted(hours_by_minute.items())):
+            job_id = sys.intern(f"{camera.name}_{schedule.name}_daily_{i}")
+            hour_list = ",".join(str(hour) for hour in sorted(hours))
 
-            trigger = CronTrigger(
-                hour=capture_time.hour,
-                minute=capture_time.minute
-            )
+            trigger = self._get_cron(hour=hour_list, minute=minute)
 
             self.scheduler.add_job(
                 self._execute_capture,
                 trigger=trigger,
                 id=job_id,
-                args=[camera],
+                args=[camera.name],
                 replace_existing=True
             )
 
             job_ids.append(job_id)
-            logger.info(f"Added daily job at {capture_time} for {camera.name}: {job_id}")
+            logger.info(
+                "Added daily job at minute %s of hours %s for %s: %s",
+                minute, hour_list, camera.name, job_id
+            )
 
         return job_ids
 
-    def _calculate_distributed_times(
+    def _distribute_minutes(
         self,
         count: int,
         time_window: Optional[TimeWindow]
-    ) -> list[time]:
-        """Calculate evenly distributed times across a window."""
+    ) -> Iterator[int]:
+        """Yield evenly distributed capture times across a window, as minutes from midnight.
+
+        Values past midnight are not wrapped; callers take them modulo a day.
+        """
         if time_window:
             start_minutes = time_window.start.hour * 60 + time_window.start.minute
             end_minutes = time_window.end.hour * 60 + time_window.end.minute
@@ -176,19 +239,11 @@ class ScheduleManager:
         total_minutes = end_minutes - start_minutes
 
         if count <= 1:
-            mid = (start_minutes + end_minutes) // 2
-            return [time(hour=(mid // 60) % 24, minute=mid % 60)]
-
-        interval = total_minutes / (count - 1) if count > 1 else total_minutes
+            yield (start_minutes + end_minutes) // 2
+            return
 
-        times = []
         for i in range(count):
-            minutes = int(start_minutes + i * interval)
-            hour = (minutes // 60) % 24
-            minute = minutes % 60
-            times.append(time(hour=hour, minute=minute))
-
-        return times
+            yield start_minutes + (i * total_minutes) // (count - 1)
 
     def _get_hour_range(self, time_window: TimeWindow) -> str:
         """Convert time window to cron hour range."""
@@ -200,97 +255,72 @@ class ScheduleManager:
 
         return f"{start_hour}-{end_hour}"
 
-    def _execute_capture(self, camera: CameraConfig) -> None:
+    def _execute_capture(self, camera_name: str) -> None:
         """Execute capture for a camera."""
-        if self._capture_callback:
-            logger.debug(f"Executing scheduled capture for {camera.name}")
+        # Looked up at fire time, so settings-only updates need no job changes
+        camera = self._cameras.get(camera_name)
+        if camera and self._capture_callback:
+            logger.debug("Executing scheduled capture for %s", camera_name)
             try:
                 self._capture_callback(camera)
             except Exception as e:
-                logger.error(f"Capture failed for {camera.name}: {e}")
+                logger.error("Capture failed for %s: %s", camera_name, e)
 
     def _execute_capture_with_window_check(
         self,
-        camera: CameraConfig,
+        camera_name: str,
         time_window: Optional[TimeWindow]
     ) -> None:
         """Execute capture with time window validation."""
-        if time_window and not self._is_within_window(time_window):
-            logger.debug(
-                f"Skipping capture for {camera.name}: outside time window"
-            )
+        if time_window and not time_window.contains_now():
+            logger.debug("Skipping capture for %s: outside time window", camera_name)
             return
 
-        self._execute_capture(camera)
-
-    def _is_within_window(self, time_window: TimeWindow) -> bool:
-        """Check if current time is within the time window."""
-        now = datetime.now().time()
-        start = time_window.start
-        end = time_window.end
-
-        if start <= end:
-            return start <= now <= end
-        else:
-            return now >= start or now <= end
+        self._execute_capture(camera_name)
 
     def remove_camera(self, camera_name: str) -> None:
         """Remove all schedules for a camera."""
-        if camera_name in self._job_ids:
-            for job_id in self._job_ids[camera_name]:
-                try:
-                    self.scheduler.remove_job(job_id)
-                    logger.info(f"Removed job: {job_id}")
-                except Exception:
-                    pass
-            del self._job_ids[camera_name]
-
-        if camera_name in self._cameras:
-            del self._cameras[camera_name]
+        self._remove_jobs(self._job_ids.pop(camera_name, ()))
+        self._schedule_jobs.pop(camera_name, None)
+        self._cameras.pop(camera_name, None)
 
     def update_camera(self, camera: CameraConfig) -> None:
-        """Update schedules for a camera."""
-        self.remove_camera(camera.name)
+        """Update schedules for a camera, re-creating jobs only for changed schedules."""
         self._cameras[camera.name] = camera
-        if camera.enabled:
-            self._add_camera_schedules(camera)
+        self._sync_camera_schedules(camera)
 
     def pause_camera(self, camera_name: str) -> None:
         """Pause all jobs for a camera."""
-        if camera_name in self._job_ids:
-            for job_id in self._job_ids[camera_name]:
-                try:
-                    self.scheduler.pause_job(job_id)
-                except Exception:
-                    pass
-            logger.info(f"Paused all jobs for {camera_name}")
+        job_ids = self._existing_jobs(self._job_ids.get(camera_name, ()))
+        for job_id in job_ids:
+            self.scheduler.pause_job(job_id)
+        if job_ids:
+            logger.info("Paused all jobs for %s", camera_name)
 
     def resume_camera(self, camera_name: str) -> None:
         """Resume all jobs for a camera."""
-        if camera_name in self._job_ids:
-            for job_id in self._job_ids[camera_name]:
-                try:
-                    self.scheduler.resume_job(job_id)
-                except Exception:
-                    pass
-            logger.info(f"Resumed all jobs for {camera_name}")
+        job_ids = self._existing_jobs(self._job_ids.get(camera_name, ()))
+        for job_id in job_ids:
+            self.scheduler.resume_job(job_id)
+        if job_ids:
+            logger.info("Resumed all jobs for %s", camera_name)
 
     def get_next_run_times(self) -> dict[str, list[dict]]:
         """Get next run times for all cameras."""
         result = {}
+        jobs_by_id = {job.id: job for job in self.scheduler.get_jobs()}
 
         for camera_name, job_ids in self._job_ids.items():
             result[camera_name] = []
             for job_id in job_ids:
-                try:
-                    job = self.scheduler.get_job(job_id)
-                    if job and job.next_run_time:
-                        result[camera_name].append({
-                            "job_id": job_id,
-                            "next_run": job.next_run_time.isoformat()
-                        })
-                except Exception:
-                    pass
+                job = jobs_by_id.get(job_id)
+                # Jobs added before start() have no next_run_time attribute yet
+                next_run_time = getattr(job, "next_run_time", None)
+                if next_run_time:
+                    result[camera_name].append({
+                        "job_id": job_id,
+                        "next_run": next_run_time.isoformat()
+                    })
 
         return result
 
@@ -298,9 +328,10 @@ class ScheduleManager:
         """Get information about all scheduled jobs."""
         jobs = []
         for job in self.scheduler.get_jobs():
+            next_run_time = getattr(job, "next_run_time", None)
             jobs.append({
                 "id": job.id,
-                "next_run": job.next_run_time.isoformat() if job.next_run_time else None,
+                "next_run": next_run_time.isoformat() if next_run_time else None,
                 "trigger": str(job.trigger)
             })
         return jobs
@@ -0,0 +1,243 @@
+"""Helpers for walking the on-disk capture tree.
+
+Captures are stored as ``{camera}/{YYYY-MM}/{camera}_{YYYY-MM-DD_HH-MM-SS}.jpg``.
+"""
+
+import logging
+import os
+import re
+import sqlite3
+import threading
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+TIMESTAMP_FORMAT = "%Y-%m-%d_%H-%M-%S"
+
+# Timestamps sort lexicographically, so range checks can compare strings
+_TIMESTAMP_RE = re.compile(r"\d{4}-\d{2}-\d{2}_\d{2}-\d{2}-\d{2}")
+
+
+def timestamp_to_iso(stamp: str) -> str:
+    """Convert a YYYY-MM-DD_HH-MM-SS capture timestamp to ISO 8601."""
+    return f"{stamp[0:10]}T{stamp[11:13]}:{stamp[14:16]}:{stamp[17:19]}"
+
+
+def iter_jpg_files(path: str) -> Iterator[os.DirEntry]:
+    """Recursively yield .jpg entries below a directory."""
+    with os.scandir(path) as it:
+        for entry in it:
+            if entry.is_dir(follow_symlinks=False):
+                yield from iter_jpg_files(entry.path)
+            elif entry.name.endswith(".jpg"):
+                yield entry
+
+
+def _entry_name(entry: os.DirEntry) -> str:
+    return entry.name
+
+
+def _entry_stamp(entry: os.DirEntry) -> str:
+    return entry.name[-23:-4]
+
+
+def iter_month_dirs(
+    camera_dir: Path,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None
+) -> Iterator[os.DirEntry]:
+    """Yield a camera's month directories that can hold captures in range, oldest first."""
+    try:
+        with os.scandir(camera_dir) as it:
+            months = [entry for entry in it if entry.is_dir()]
+    except FileNotFoundError:
+        return
+
+    # YYYY-MM names sort chronologically, so the range is a sorted slice
+    months.sort(key=_entry_name)
+
+    lo, hi = 0, len(months)
+    if start_date:
+        lo = bisect_left(months, start_date.strftime("%Y-%m"), key=_entry_name)
+    if end_date:
+        hi = bisect_right(months, end_date.strftime("%Y-%m"), key=_entry_name)
+
+    yield from months[lo:hi]
+
+
+def iter_captures(
+    camera_dir: Path,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None
+) -> Iterator[tuple[str, os.DirEntry]]:
+    """Yield (timestamp, entry) for a camera's captures within a date range, oldest first."""
+    start_stamp = start_date.strftime(TIMESTAMP_FORMAT) if start_date else None
+    end_stamp = end_date.strftime(TIMESTAMP_FORMAT) if end_date else None
+
+    for month in iter_month_dirs(camera_dir, start_date, end_date):
+        with os.scandir(month.path) as it:
+            captures = [
+                entry for entry in it
+                if entry.name.endswith(".jpg")
+                and _TIMESTAMP_RE.fullmatch(_entry_stamp(entry))
+            ]
+
+        captures.sort(key=_entry_stamp)
+
+        lo, hi = 0, len(captures)
+        if start_stamp:
+            lo = bisect_left(captures, start_stamp, key=_entry_stamp)
+        if end_stamp:
+            hi = bisect_right(captures, end_stamp, key=_entry_stamp)
+
+        for entry in captures[lo:hi]:
+            yield _entry_stamp(entry), entry
+
+
+# Where earlier versions kept the index, inside the captures directory
+LEGACY_INDEX_FILENAME = ".index.db"
+
+_INDEX_SCHEMA = """
+CREATE TABLE IF NOT EXISTS captures (
+    path TEXT PRIMARY KEY,
+    camera TEXT NOT NULL,
+    ts TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_cam_ts ON captures(camera, ts);
+CREATE INDEX IF NOT EXISTS idx_ts ON captures(ts);
+"""
+
+
+class CaptureIndex:
+    """SQLite index of the capture tree, so listings don't rescan the disk.
+
+    Paths are stored relative to the captures directory with forward
+    slashes, and timestamps in the file-name format, which sorts
+    chronologically.
+    """
+
+    def __init__(self, captures_path: Path, index_path: Optional[Path] = None):
+        """Open the index at index_path, or keep it in memory when there is none."""
+        self.captures_path = Path(captures_path)
+        self._lock = threading.Lock()
+        self.version = 0  # Bumped on every change, for cache validation
+
+        self._db = sqlite3.connect(
+            str(index_path) if index_path else ":memory:", check_same_thread=False
+        )
+        with self._lock:
+            try:
+                self._db.execute("PRAGMA journal_mode=WAL")
+                self._db.executescript(_INDEX_SCHEMA)
+            except sqlite3.OperationalError as e:
+                # WAL needs shared memory, which network filesystems often can't provide
+                logger.warning(f"Using a rollback journal for {index_path}: {e}")
+                self._db.execute("PRAGMA journal_mode=DELETE")
+                self._db.executescript(_INDEX_SCHEMA)
+
+    def add(self, camera: str, path: Path) -> None:
+        """Record a new capture file."""
+        rel_path = path.relative_to(self.captures_path).as_posix()
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO captures (path, camera, ts) VALUES (?, ?, ?)",
+                (rel_path, camera, path.name[-23:-4])
+            )
+            self.version += 1
+
+    def captures_for_camera(
+        self,
+        camera: str,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None
+    ) -> list[str]:
+        """Get relative paths of a camera's captures within a date range, oldest first."""
+        start_stamp = start_date.strftime(TIMESTAMP_FORMAT) if start_date else ""
+        end_stamp = end_date.strftime(TIMESTAMP_FORMAT) if end_date else "~"
+
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT path FROM captures WHERE camera = ? AND ts BETWEEN ? AND ? "
+                "ORDER BY ts",
+                (camera, start_stamp, end_stamp)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def camera_summaries(self) -> dict[str, tuple[int, str, str]]:
+        """Get (count, newest timestamp, newest relative path) of every camera's captures."""
+        # SQLite takes a bare column alongside MAX() from the row holding the maximum
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT camera, COUNT(*), MAX(ts), path FROM captures GROUP BY camera"
+            ).fetchall()
+        return {camera: (count, stamp, rel_path) for camera, count, stamp, rel_path in rows}
+
+    def recent(
+        self,
+        limit: int,
+        camera: Optional[str] = None
+    ) -> list[tuple[str, str, str]]:
+        """Get (camera, timestamp, relative path) of the newest captures."""
+        with self._lock:
+            if camera is None:
+                return self._db.execute(
+                    "SELECT camera, ts, path FROM captures ORDER BY ts DESC LIMIT ?",
+                    (limit,)
+                ).fetchall()
+            return self._db.execute(
+                "SELECT camera, ts, path FROM captures WHERE camera = ? "
+                "ORDER BY ts DESC LIMIT ?",
+                (camera, limit)
+            ).fetchall()
+
+    def remove(self, paths: Iterable[Path]) -> None:
+        """Forget capture files that no longer exist."""
+        rel_paths = [(path.relative_to(self.captures_path).as_posix(),) for path in paths]
+        if not rel_paths:
+            return
+        with self._lock, self._db:
+            self._db.executemany("DELETE FROM captures WHERE path = ?", rel_paths)
+            self.version += 1
+
+    def reconcile(self) -> None:
+        """Bring the index in line with the capture tree on disk."""
+        rows = {}
+
+        with os.scandir(self.captures_path) as it:
+            camera_dirs = [entry for entry in it if entry.is_dir()]
+
+        for camera_dir in camera_dirs:
+            for stamp, entry in iter_captures(Path(camera_dir.path)):
+                rel_path = Path(entry.path).relative_to(self.captures_path).as_posix()
+                rows[rel_path] = (rel_path, camera_dir.name, stamp)
+
+        with self._lock, self._db:
+            indexed = {path for path, in self._db.execute("SELECT path FROM captures")}
+            # Captures added since the scan are indexed but not in rows, so
+            # only rows whose file is really gone are dropped
+            gone = [
+                (path,) for path in indexed - rows.keys()
+                if not (self.captures_path / path).exists()
+            ]
+            new = [row for path, row in rows.items() if path not in indexed]
+
+            self._db.executemany("DELETE FROM captures WHERE path = ?", gone)
+            self._db.executemany(
+                "INSERT OR REPLACE INTO captures (path, camera, ts) VALUES (?, ?, ?)",
+                new
+            )
+            if gone or new:
+                self.version += 1
+
+        logger.info(
+            f"Indexed {len(rows)} captures in {self.captures_path} "
+            f"({len(new)} added, {len(gone)} removed)"
+        )
+
+    def close(self) -> None:
+        """Close the index database."""
+        with self._lock:
+            self._db.close()
@@ -1,12 +1,23 @@
 """Flask web application for RTSP Timelapse Generator."""
 
 import functools
+import hashlib
+import hmac
 import logging
+import mimetypes
+import operator
 import os
+import sys
+import tempfile
+import threading
 import uuid
-from datetime import datetime
+from dataclasses import fields, replace
+from datetime import date, datetime, time
 from pathlib import Path
-from typing import Optional
+from time import monotonic
+from typing import Any, Callable, Iterable, Optional
+from urllib.parse import quote
+from zlib import adler32
 
 from flask import (
     Flask,
@@ -16,22 +27,36 @@ from flask import (
     render_template,
     send_file,
     abort,
+    current_app,
+    make_response,
+    stream_with_context,
     Response
 )
+from flask.json.provider import DefaultJSONProvider
+from werkzeug.datastructures import Authorization
+from werkzeug.exceptions import NotFound
+from werkzeug.http import http_date
+from werkzeug.wsgi import wrap_file
 
 from ..config import ConfigManager
 from ..capture import CaptureManager
 from ..scheduler import ScheduleManager
-from ..exporter import Exporter
+from ..exporter import Exporter, ExportError
 from ..models import (
     CameraConfig,
     Schedule,
-    FrequencyType,
-    TimeWindow,
     CaptureSettings,
     PendingExport,
+    ExportHistory,
+    WebUIConfig,
 )
 
+# orjson is optional; the stdlib json encoder is used when it is unavailable
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 logger = logging.getLogger(__name__)
 
 # Global references (set by create_app)
@@ -40,15 +65,100 @@ _capture_manager: Optional[CaptureManager] = None
 _schedule_manager: Optional[ScheduleManager] = None
 _exporter: Optional[Exporter] = None
 
+# Resolved storage directories with a trailing separator (set by create_app)
+_captures_root = ''
+_exports_root = ''
+
+# Export history entries are sent whole; attrgetter fetches every field in one call
+_HISTORY_KEYS = tuple(f.name for f in fields(ExportHistory))
+_history_values = operator.attrgetter(*_HISTORY_KEYS)
+
+# For files whose names never get reused; private, since they may sit behind basic auth
+_IMMUTABLE_CACHE_CONTROL = 'private, max-age=31536000, immutable'
+
+# Two captures within one second share a name, so browsers revalidate
+# capture images by ETag instead of keeping them
+_CAPTURE_CACHE_CONTROL = 'private, no-cache'
+
+# Short-lived results of directory walks, keyed by name: (expiry, value)
+STATS_CACHE_TTL = 2.0
+_stats_cache: dict[str, tuple[float, Any]] = {}
+_stats_cache_lock = threading.Lock()
+
+# The WebUIConfig the expected credentials were encoded from, and those credentials
+_auth_credentials: Optional[tuple[WebUIConfig, bytes, bytes]] = None
+
+# Session secret kept in the config directory when SECRET_KEY is not set
+SECRET_KEY_FILENAME = '.secret_key'
+SECRET_KEY_BYTES = 32
+
+# Rendered page HTML and its ETag, by (endpoint, script root)
+_page_cache: dict[tuple[str, str], tuple[str, str]] = {}
+
+# Distinguishes this process's ETags, whose counters restart from zero
+_INSTANCE_ID = uuid.uuid4().hex[:8]
+
 api = Blueprint('api', __name__, url_prefix='/api')
 pages = Blueprint('pages', __name__)
 
 
+class AppJSONProvider(DefaultJSONProvider):
+    """JSON provider writing dates and times as ISO 8601, using orjson when installed.
+
+    The orjson path keeps Flask's sort_keys setting and pretty-prints whenever
+    Flask asks for an indent, always with two spaces, orjson's only width.
+    """
+
+    @staticmethod
+    def default(o):
+        if isinstance(o, (date, time)):
+            return o.isoformat()
+        return DefaultJSONProvider.default(o)
+
+    def dumps(self, obj, **kwargs) -> str:
+        if orjson is None:
+            return super().dumps(obj, **kwargs)
+
+        option = orjson.OPT_NON_STR_KEYS
+        if kwargs.get('sort_keys', self.sort_keys):
+            option |= orjson.OPT_SORT_KEYS
+        if kwargs.get('indent'):
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=self.default, option=option).decode()
+
+    def loads(self, s, **kwargs):
+        if orjson is None:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+
+def _credentials_valid(
+    web_ui: WebUIConfig,
+    username: Optional[str],
+    password: Optional[str]
+) -> bool:
+    """Check basic auth credentials against the configured ones in constant time."""
+    global _auth_credentials
+
+    # Encoded once per loaded config; a reload brings a new WebUIConfig
+    cached = _auth_credentials
+    if cached is None or cached[0] is not web_ui:
+        cached = _auth_credentials = (
+            web_ui, web_ui.username.encode(), web_ui.password.encode()
+        )
+
+    # Both are always compared, so timing doesn't reveal which one was wrong
+    user_ok = hmac.compare_digest((username or '').encode(), cached[1])
+    pass_ok = hmac.compare_digest((password or '').encode(), cached[2])
+    return user_ok and pass_ok
+
+
 def require_auth(f):
     """Decorator for basic auth if enabled."""
     @functools.wraps(f)
     def decorated(*args, **kwargs):
-        if _config_manager and _config_manager.app_config.web_ui.auth_enabled:
+        web_ui = _config_manager.app_config.web_ui if _config_manager else None
+        if web_ui and web_ui.auth_enabled:
             auth = request.authorization
             if not auth:
                 return Response(
@@ -57,66 +167,169 @@ def require_auth(f):
                     {'WWW-Authenticate': 'Basic realm="RTSP Timelapse"'}
                 )
 
-            expected_user = _config_manager.app_config.web_ui.username
-            expected_pass = _config_manager.app_config.web_ui.password
-
-            if auth.username != expected_user or auth.password != expected_pass:
+            if not _credentials_valid(web_ui, auth.username, auth.password):
                 return Response('Invalid credentials', 401)
 
         return f(*args, **kwargs)
     return decorated
 
 
+def _cached_stats(key: str, compute: Callable[[], Any]) -> Any:
+    """Get a value from the stats cache, computing it if missing or expired."""
+    now = monotonic()
+    with _stats_cache_lock:
+        entry = _stats_cache.get(key)
+    if entry and entry[0] > now:
+        return entry[1]
+
+    value = compute()
+    with _stats_cache_lock:
+        _stats_cache[key] = (now + STATS_CACHE_TTL, value)
+    return value
+
+
+def _invalidate_stats() -> None:
+    """Drop cached stats after a change the user should see immediately."""
+    with _stats_cache_lock:
+        _stats_cache.clear()
+
+
+def _get_camera_or_404(name: str) -> CameraConfig:
+    """Look up a camera by name, aborting with 404 when there is none."""
+    camera = _config_manager.cameras.get(name)
+    if camera is None:
+        abort(404, description='Camera not found')
+    return camera
+
+
+def _json_array_response(items: Iterable) -> Response:
+    """Stream items as a JSON array, serializing one element at a time."""
+    dumps = current_app.json.dumps
+
+    def generate():
+        first = True
+        yield '['
+        for item in items:
+            if first:
+                first = False
+                yield dumps(item)
+            else:
+                yield ',' + dumps(item)
+        yield ']'
+
+    return Response(stream_with_context(generate()), mimetype='application/json')
+
+
+def _is_hidden(rel_path: str) -> bool:
+    """Check whether any component of a normalized relative path is a dotfile."""
+    return any(part.startswith('.') for part in rel_path.split(os.sep))
+
+
+def _send_stored_file(root: str, location: str, rel_path: str, **kwargs) -> Response:
+    """Send a capture or export file, letting the front-end server copy it when configured.
+
+    root is the storage directory with a trailing separator and location its
+    name below the X-Accel-Redirect prefix ("captures" or "exports"). Without
+    a prefix the file goes through send_file, which emits X-Sendfile instead
+    when USE_X_SENDFILE is set.
+    """
+    # Purely lexical: normpath collapses "..", so no symlinks are resolved
+    path = os.path.normpath(os.path.join(root, rel_path))
+    if not path.startswith(root):
+        abort(403)
+
+    if _is_hidden(path[len(root):]):
+        abort(404)
+
+    if not os.path.isfile(path):
+        abort(404)
+
+    prefix = current_app.config.get('X_ACCEL_REDIRECT')
+    if not prefix:
+        return send_file(path, conditional=True, **kwargs)
+
+    filename = os.path.basename(path)
+    mimetype = (
+        kwargs.get('mimetype')
+        or mimetypes.guess_type(filename)[0]
+        or 'application/octet-stream'
+    )
+    internal_path = f"{location}/{path[len(root):].replace(os.sep, '/')}"
+    response = Response(mimetype=mimetype)
+    response.headers['X-Accel-Redirect'] = f"{prefix.rstrip('/')}/{quote(internal_path)}"
+    if kwargs.get('as_attachment'):
+        response.headers.set('Content-Disposition', 'attachment', filename=filename)
+    return response
+
+
 # ============== API Routes ==============
 
 @api.route('/cameras', methods=['GET'])
 @require_auth
 def list_cameras():
     """List all cameras with status."""
-    cameras = []
-
-    for name, camera in _config_manager.cameras.items():
-        captures = _capture_manager.get_captures_for_camera(name)
-        last_capture = None
-        last_capture_path = None
-        last_capture_time = None
-        if captures:
-            last_capture = captures[-1].name
-            last_capture_path = str(captures[-1].relative_to(_capture_manager.captures_path))
-            # Parse timestamp from filename
-            try:
-                filename = captures[-1].stem
-                date_str = "_".join(filename.split("_")[1:])
-                capture_time = datetime.strptime(date_str, "%Y-%m-%d_%H-%M-%S")
-                last_capture_time = capture_time.isoformat()
-            except ValueError:
-                pass
-
-        cameras.append({
-            'name': name,
-            'url': camera.url,
-            'enabled': camera.enabled,
-            'schedule_count': len(camera.schedules),
-            'capture_count': len(captures),
-            'last_capture': last_capture,
-            'last_capture_path': last_capture_path,
-            'last_capture_time': last_capture_time,
-            'schedules': [
-                {
-                    'name': s.name,
-                    'frequency': s.frequency.value,
-                    'enabled': s.enabled,
-                    'value': s.value,
-                    'time_window': {
-                        'start': s.time_window.start.strftime('%H:%M') if s.time_window else None,
-                        'end': s.time_window.end.strftime('%H:%M') if s.time_window else None,
-                    } if s.time_window else None
-                }
-                for s in camera.schedules
-            ]
-        })
-
-    return jsonify(cameras)
+    # The listing only changes when the cameras or the capture index do, so
+    # dashboard polls can be answered without building it
+    etag = (
+        f"{_INSTANCE_ID}-{_config_manager.cameras_version}-"
+        f"{_capture_manager.index.version}"
+    )
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+        response.set_etag(etag, weak=True)
+        return response
+
+    # One grouped index query covers every camera
+    summaries = _capture_manager.get_capture_summaries()
+    response = _json_array_response(
+        _camera_status(name, camera, summaries.get(name, _NO_CAPTURES))
+        for name, camera in list(_config_manager.cameras.items())
+    )
+    response.set_etag(etag, weak=True)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+_NO_CAPTURES = {'count': 0, 'last_capture': None, 'path': None, 'timestamp': None}
+
+
+def _camera_status(name: str, camera: CameraConfig, summary: dict) -> dict:
+    """Build the list_cameras entry for one camera."""
+    return {
+        'name': name,
+        'url': camera.url,
+        'enabled': camera.enabled,
+        'schedule_count': len(camera.schedules),
+        'capture_count': summary['count'],
+        'last_capture': summary['last_capture'],
+        'last_capture_path': summary['path'],
+        'last_capture_time': summary['timestamp'],
+        'schedules': [_schedule_dict(s) for s in camera.schedules]
+    }
+
+
+def _parse_date_range(data: dict) -> tuple[datetime, datetime]:
+    """Parse start_date and end_date (YYYY-MM-DD) into a range covering both whole days."""
+    # fromisoformat is a C fast path; strptime parses its format on every call
+    start_date = datetime.combine(date.fromisoformat(data.get('start_date')), time.min)
+    end_date = datetime.combine(date.fromisoformat(data.get('end_date')), time(23, 59, 59))
+    return start_date, end_date
+
+
+def _schedule_dict(schedule: Schedule) -> dict:
+    """Serialize a schedule for the API."""
+    tw = schedule.time_window
+    return {
+        'name': schedule.name,
+        'frequency': schedule.frequency.value,
+        'enabled': schedule.enabled,
+        'value': schedule.value,
+        # f-strings skip strftime's per-call format parsing
+        'time_window': {
+            'start': f'{tw.start.hour:02d}:{tw.start.minute:02d}',
+            'end': f'{tw.end.hour:02d}:{tw.end.minute:02d}'
+        } if tw else None
+    }
 
 
 @api.route('/cameras', methods=['POST'])
@@ -136,37 +349,27 @@ def add_camera():
     if not url:
         return jsonify({'error': 'Camera URL is required'}), 400
 
-    schedules = []
-    for sched_data in data.get('schedules', []):
-        tw = None
-        if sched_data.get('time_window'):
-            tw = TimeWindow(
-                start=datetime.strptime(sched_data['time_window']['start'], '%H:%M').time(),
-                end=datetime.strptime(sched_data['time_window']['end'], '%H:%M').time()
-            )
+    try:
+        schedules = _parse_schedules(data.get('schedules', []))
+    except (ValueError, TypeError, AttributeError):
+        return jsonify({'error': 'Invalid schedule'}), 400
 
-        schedules.append(Schedule(
-            name=sched_data.get('name', 'default'),
-            frequency=FrequencyType(sched_data.get('frequency', 'hourly')),
-            enabled=sched_data.get('enabled', True),
-            value=sched_data.get('value', 1),
-            time_window=tw
-        ))
+    try:
+        # Settings are sent alongside the camera fields rather than nested
+        settings = _parse_capture_settings(data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
 
     camera = CameraConfig(
-        name=name,
+        name=sys.intern(name),
         url=url,
         enabled=data.get('enabled', True),
         schedules=schedules,
-        capture_settings=CaptureSettings(
-            jpeg_quality=data.get('jpeg_quality', 90),
-            timeout_seconds=data.get('timeout_seconds', 10),
-            retry_count=data.get('retry_count', 3)
-        )
+        capture_settings=CaptureSettings(**settings)
     )
 
     _config_manager.cameras[name] = camera
-    _config_manager.save_cameras_config()
+    _config_manager.schedule_cameras_save()
     _schedule_manager.update_camera(camera)
 
     logger.info(f"Added camera: {name}")
@@ -177,59 +380,145 @@ def add_camera():
 @require_auth
 def update_camera(name):
     """Update a camera."""
-    if name not in _config_manager.cameras:
-        return jsonify({'error': 'Camera not found'}), 404
-
+    camera = _get_camera_or_404(name)
     data = request.json
-    camera = _config_manager.cameras[name]
+    if not _is_camera_update(data):
+        return jsonify({'error': 'Invalid camera update'}), 400
+
+    try:
+        schedules, settings = _parse_camera_update(data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    _apply_camera_update(camera, data, schedules, settings)
+
+    _config_manager.schedule_cameras_save()
+    _schedule_manager.update_camera(camera)
+
+    logger.info(f"Updated camera: {name}")
+    return jsonify({'success': True})
 
+
+def _parse_schedules(items: list) -> list[Schedule]:
+    """Build schedules from request data, raising ValueError or TypeError on bad input."""
+    schedules = []
+    for sched_data in items:
+        if not isinstance(sched_data, dict):
+            raise TypeError('Schedule must be an object')
+
+        # Checked here, since the scheduler only fails on it once the camera is applied
+        value = sched_data.get('value', 1)
+        if type(value) is not int or value < 1:
+            raise ValueError('Schedule value must be a positive integer')
+
+        # An empty time window means no window, not the whole day
+        if not sched_data.get('time_window'):
+            sched_data = {**sched_data, 'time_window': None}
+
+        schedules.append(Schedule.from_dict(sched_data))
+    return schedules
+
+
+def _is_camera_update(data) -> bool:
+    """Check that request data has the shape _apply_camera_update expects."""
+    return isinstance(data, dict) and isinstance(data.get('capture_settings', {}), dict)
+
+
+def _is_named_camera_update(data) -> bool:
+    """Check a bulk update entry, which also names its camera."""
+    return _is_camera_update(data) and isinstance(data.get('name'), str)
+
+
+# Capture settings the web UI may set, with their allowed (inclusive) ranges
+_EDITABLE_CAPTURE_SETTINGS = {
+    'jpeg_quality': (1, 100),
+    'timeout_seconds': (1, 3600),
+    'retry_count': (1, 100),
+}
+
+
+def _parse_capture_settings(data: dict) -> dict[str, int]:
+    """Pick the editable capture settings out of request data, raising ValueError on bad values."""
+    settings = {}
+    for key, (low, high) in _EDITABLE_CAPTURE_SETTINGS.items():
+        if key not in data:
+            continue
+        value = data[key]
+        # type() rather than isinstance(), so JSON true/false are rejected
+        if type(value) is not int or not low <= value <= high:
+            raise ValueError(f'Invalid {key}')
+        settings[key] = value
+    return settings
+
+
+def _parse_camera_update(data: dict) -> tuple[Optional[list[Schedule]], dict[str, int]]:
+    """Parse the schedules and capture settings of an update, raising ValueError on bad input."""
+    try:
+        schedules = _parse_schedules(data['schedules']) if 'schedules' in data else None
+    except (ValueError, TypeError, AttributeError):
+        raise ValueError('Invalid schedule')
+    return schedules, _parse_capture_settings(data.get('capture_settings', {}))
+
+
+def _apply_camera_update(
+    camera: CameraConfig,
+    data: dict,
+    schedules: Optional[list[Schedule]],
+    settings: dict[str, int]
+) -> None:
+    """Apply the fields present in an update request to a camera in place."""
     if 'url' in data:
         camera.url = data['url']
     if 'enabled' in data:
         camera.enabled = data['enabled']
+    if schedules is not None:
+        camera.schedules = schedules
+    if settings:
+        camera.capture_settings = replace(camera.capture_settings, **settings)
 
-    if 'schedules' in data:
-        schedules = []
-        for sched_data in data['schedules']:
-            tw = None
-            if sched_data.get('time_window'):
-                tw = TimeWindow(
-                    start=datetime.strptime(sched_data['time_window']['start'], '%H:%M').time(),
-                    end=datetime.strptime(sched_data['time_window']['end'], '%H:%M').time()
-                )
 
-            schedules.append(Schedule(
-                name=sched_data.get('name', 'default'),
-                frequency=FrequencyType(sched_data.get('frequency', 'hourly')),
-                enabled=sched_data.get('enabled', True),
-                value=sched_data.get('value', 1),
-                time_window=tw
-            ))
-        camera.schedules = schedules
+@api.route('/cameras', methods=['PUT'])
+@require_auth
+def update_cameras():
+    """Update several cameras at once, with a single delayed config save."""
+    body = request.json
+    updates = body.get('cameras', []) if isinstance(body, dict) else None
+    if not isinstance(updates, list) or not all(map(_is_named_camera_update, updates)):
+        return jsonify({'error': 'Invalid camera update'}), 400
+
+    missing = [
+        data.get('name') for data in updates
+        if data.get('name') not in _config_manager.cameras
+    ]
+    if missing:
+        return jsonify({'error': 'Camera not found', 'cameras': missing}), 404
+
+    # Parse everything first, so a bad entry leaves every camera untouched
+    try:
+        parsed = [_parse_camera_update(data) for data in updates]
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
 
-    if 'capture_settings' in data:
-        cs = data['capture_settings']
-        camera.capture_settings.jpeg_quality = cs.get('jpeg_quality', camera.capture_settings.jpeg_quality)
-        camera.capture_settings.timeout_seconds = cs.get('timeout_seconds', camera.capture_settings.timeout_seconds)
-        camera.capture_settings.retry_count = cs.get('retry_count', camera.capture_settings.retry_count)
+    for data, (schedules, settings) in zip(updates, parsed):
+        camera = _config_manager.cameras[data['name']]
+        _apply_camera_update(camera, data, schedules, settings)
+        _schedule_manager.update_camera(camera)
 
-    _config_manager.save_cameras_config()
-    _schedule_manager.update_camera(camera)
+    _config_manager.schedule_cameras_save()
 
-    logger.info(f"Updated camera: {name}")
-    return jsonify({'success': True})
+    logger.info(f"Updated {len(updates)} cameras")
+    return jsonify({'success': True, 'updated': [data['name'] for data in updates]})
 
 
 @api.route('/cameras/<name>', methods=['DELETE'])
 @require_auth
 def delete_camera(name):
     """Delete a camera."""
-    if name not in _config_manager.cameras:
-        return jsonify({'error': 'Camera not found'}), 404
+    _get_camera_or_404(name)
 
     _schedule_manager.remove_camera(name)
     del _config_manager.cameras[name]
-    _config_manager.save_cameras_config()
+    _config_manager.schedule_cameras_save()
 
     logger.info(f"Deleted camera: {name}")
     return jsonify({'success': True})
@@ -239,13 +528,11 @@ def delete_camera(name):
 @require_auth
 def trigger_capture(name):
     """Manually trigger a capture."""
-    if name not in _config_manager.cameras:
-        return jsonify({'error': 'Camera not found'}), 404
-
-    camera = _config_manager.cameras[name]
+    camera = _get_camera_or_404(name)
     result = _capture_manager.capture_frame(camera)
 
     if result:
+        _invalidate_stats()
         return jsonify({
             'success': True,
             'path': str(result.relative_to(_capture_manager.captures_path))
@@ -254,15 +541,36 @@ def trigger_capture(name):
         return jsonify({'success': False, 'error': 'Capture failed'}), 500
 
 
+@api.route('/cameras/capture', methods=['POST'])
+@require_auth
+def trigger_capture_all():
+    """Manually trigger a capture on every enabled camera at once."""
+    cameras = [camera for camera in list(_config_manager.cameras.values()) if camera.enabled]
+    results = _capture_manager.capture_frames(cameras)
+
+    if any(results):
+        _invalidate_stats()
+    return jsonify({
+        'success': all(results),
+        'captures': {
+            camera.name: (
+                str(result.relative_to(_capture_manager.captures_path)) if result else None
+            )
+            for camera, result in zip(cameras, results)
+        }
+    })
+
+
 @api.route('/cameras/<name>/test', methods=['GET'])
 @require_auth
 def test_camera(name):
     """Test camera connection."""
-    if name not in _config_manager.cameras:
-        return jsonify({'error': 'Camera not found'}), 404
-
-    camera = _config_manager.cameras[name]
-    result = _capture_manager.test_connection(camera.url)
+    camera = _get_camera_or_404(name)
+    result = _capture_manager.test_connection(
+        camera.url,
+        camera.capture_settings.timeout_seconds,
+        camera.capture_settings.hwaccel
+    )
 
     return jsonify(result)
 
@@ -271,21 +579,11 @@ def test_camera(name):
 @require_auth
 def list_schedules():
     """List all schedules."""
-    schedules = []
-
-    for camera_name, camera in _config_manager.cameras.items():
-        for schedule in camera.schedules:
-            schedules.append({
-                'camera': camera_name,
-                'name': schedule.name,
-                'frequency': schedule.frequency.value,
-                'enabled': schedule.enabled,
-                'value': schedule.value,
-                'time_window': {
-                    'start': schedule.time_window.start.strftime('%H:%M') if schedule.time_window else None,
-                    'end': schedule.time_window.end.strftime('%H:%M') if schedule.time_window else None,
-                } if schedule.time_window else None
-            })
+    schedules = [
+        {'camera': camera_name, **_schedule_dict(schedule)}
+        for camera_name, camera in _config_manager.cameras.items()
+        for schedule in camera.schedules
+    ]
 
     next_runs = _schedule_manager.get_next_run_times()
 
@@ -303,42 +601,19 @@ def list_captures():
     limit = request.args.get('limit', 50, type=int)
     camera = request.args.get('camera')
 
-    if camera:
-        captures = []
-        for path in _capture_manager.get_captures_for_camera(camera):
-            try:
-                filename = path.stem
-                date_str = "_".join(filename.split("_")[1:])
-                capture_time = datetime.strptime(date_str, "%Y-%m-%d_%H-%M-%S")
-                captures.append({
-                    'camera': camera,
-                    'path': str(path.relative_to(_capture_manager.captures_path)),
-                    'timestamp': capture_time.isoformat(),
-                    'filename': path.name
-                })
-            except ValueError:
-                continue
-        captures.sort(key=lambda x: x['timestamp'], reverse=True)
-        captures = captures[:limit]
-    else:
-        captures = _capture_manager.get_recent_captures(limit)
-
-    return jsonify(captures)
+    # The index applies the camera filter and limit, newest first
+    return _json_array_response(_capture_manager.iter_recent_captures(limit, camera))
 
 
 @api.route('/captures/<path:capture_path>', methods=['GET'])
 @require_auth
 def serve_capture(capture_path):
     """Serve a capture image."""
-    full_path = _capture_manager.captures_path / capture_path
-
-    if not str(full_path.resolve()).startswith(str(_capture_manager.captures_path.resolve())):
-        abort(403)
-
-    if not full_path.exists():
-        abort(404)
-
-    return send_file(full_path, mimetype='image/jpeg')
+    response = _send_stored_file(
+        _captures_root, 'captures', capture_path, mimetype='image/jpeg'
+    )
+    response.headers['Cache-Control'] = _CAPTURE_CACHE_CONTROL
+    return response
 
 
 @api.route('/exports', methods=['GET'])
@@ -346,20 +621,9 @@ def serve_capture(capture_path):
 def list_exports():
     """List export history."""
     return jsonify({
-        'exports': _exporter.list_exports(),
+        'exports': _cached_stats('exports', _exporter.list_exports),
         'history': [
-            {
-                'id': h.id,
-                'camera': h.camera,
-                'start_date': h.start_date,
-                'end_date': h.end_date,
-                'preset': h.preset,
-                'output_file': h.output_file,
-                'created_at': h.created_at,
-                'image_count': h.image_count,
-                'duration_seconds': h.duration_seconds,
-                'file_size_bytes': h.file_size_bytes
-            }
+            dict(zip(_HISTORY_KEYS, _history_values(h)))
             for h in _config_manager.export_history
         ],
         'presets': {
@@ -385,9 +649,7 @@ def create_export():
         return jsonify({'error': 'Invalid camera'}), 400
 
     try:
-        start_date = datetime.strptime(data.get('start_date'), '%Y-%m-%d')
-        end_date = datetime.strptime(data.get('end_date'), '%Y-%m-%d')
-        end_date = end_date.replace(hour=23, minute=59, second=59)
+        start_date, end_date = _parse_date_range(data)
     except (ValueError, TypeError):
         return jsonify({'error': 'Invalid date format'}), 400
 
@@ -398,33 +660,51 @@ def create_export():
     preset = _config_manager.export_presets[preset_name]
 
     if data.get('fps'):
-        preset.fps = data['fps']
+        preset = replace(preset, fps=data['fps'])
 
     try:
-        history = _exporter.generate_timelapse(
+        export_id = _exporter.start_timelapse(
             camera=camera,
             start_date=start_date,
             end_date=end_date,
-            preset=preset
+            preset=preset,
+            on_complete=_export_completed
         )
+    except ExportError as e:
+        return jsonify({'error': str(e)}), 400
 
-        _config_manager.export_history.append(history)
-        _config_manager.save_exports_config()
+    return jsonify({
+        'success': True,
+        'export_id': export_id,
+        'status_url': f'/api/exports/{export_id}/status'
+    }), 202
 
-        return jsonify({
-            'success': True,
-            'export': {
-                'id': history.id,
-                'output_file': history.output_file,
-                'image_count': history.image_count,
-                'duration_seconds': history.duration_seconds,
-                'file_size_bytes': history.file_size_bytes
-            }
-        })
 
-    except Exception as e:
-        logger.error(f"Export failed: {e}")
-        return jsonify({'error': str(e)}), 500
+def _export_completed(history: ExportHistory) -> None:
+    """Record a finished background export."""
+    _config_manager.add_export_history(history)
+    _invalidate_stats()
+
+
+@api.route('/exports/<export_id>/status', methods=['GET'])
+@require_auth
+def export_status(export_id):
+    """Get the progress of a queued or running export."""
+    progress = _exporter.get_progress(export_id)
+    if progress is None:
+        return jsonify({'error': 'Export not found'}), 404
+
+    result = progress.to_dict()
+    if progress.history:
+        history = progress.history
+        result['export'] = {
+            'id': history.id,
+            'output_file': history.output_file,
+            'image_count': history.image_count,
+            'duration_seconds': history.duration_seconds,
+            'file_size_bytes': history.file_size_bytes
+        }
+    return jsonify(result)
 
 
 @api.route('/exports/calculate', methods=['POST'])
@@ -438,9 +718,7 @@ def calculate_export():
         return jsonify({'error': 'Invalid camera'}), 400
 
     try:
-        start_date = datetime.strptime(data.get('start_date'), '%Y-%m-%d')
-        end_date = datetime.strptime(data.get('end_date'), '%Y-%m-%d')
-        end_date = end_date.replace(hour=23, minute=59, second=59)
+        start_date, end_date = _parse_date_range(data)
     except (ValueError, TypeError):
         return jsonify({'error': 'Invalid date format'}), 400
 
@@ -454,30 +732,18 @@ def calculate_export():
 @require_auth
 def download_export(filename):
     """Download an export file."""
-    export_path = _exporter.exports_path / filename
-
-    if not str(export_path.resolve()).startswith(str(_exporter.exports_path.resolve())):
-        abort(403)
-
-    if not export_path.exists():
-        abort(404)
-
-    return send_file(export_path, as_attachment=True)
+    return _send_stored_file(_exports_root, 'exports', filename, as_attachment=True)
 
 
 @api.route('/exports/<filename>/stream', methods=['GET'])
 @require_auth
 def stream_export(filename):
     """Stream an export file for in-browser playback."""
-    export_path = _exporter.exports_path / filename
-
-    if not str(export_path.resolve()).startswith(str(_exporter.exports_path.resolve())):
-        abort(403)
-
-    if not export_path.exists():
-        abort(404)
-
-    return send_file(export_path, mimetype='video/mp4')
+    # Seeks are Range requests answered with 206; export names carry a unique
+    # ID, so the browser can keep fetched ranges instead of revalidating
+    response = _send_stored_file(_exports_root, 'exports', filename, mimetype='video/mp4')
+    response.headers['Cache-Control'] = _IMMUTABLE_CACHE_CONTROL
+    return response
 
 
 @api.route('/exports/<filename>', methods=['DELETE'])
@@ -485,6 +751,7 @@ def stream_export(filename):
 def delete_export(filename):
     """Delete an export file."""
     if _exporter.delete_export(filename):
+        _invalidate_stats()
         return jsonify({'success': True})
     return jsonify({'error': 'Export not found'}), 404
 
@@ -493,8 +760,8 @@ def delete_export(filename):
 @require_auth
 def storage_stats():
     """Get storage statistics."""
-    captures_stats = _capture_manager.get_storage_stats()
-    exports_stats = _exporter.get_exports_storage_stats()
+    captures_stats = _cached_stats('captures', _capture_manager.get_storage_stats)
+    exports_stats = _cached_stats('exports_storage', _exporter.get_exports_storage_stats)
 
     return jsonify({
         'captures': captures_stats,
@@ -510,52 +777,210 @@ def get_logs():
     limit = request.args.get('limit', 100, type=int)
     logs_path = _config_manager.get_logs_path() / 'rtspse.log'
 
-    if not logs_path.exists():
-        return jsonify({'lines': []})
-
     try:
-        with open(logs_path, 'r') as f:
-            lines = f.readlines()
+        stat = logs_path.stat()
+    except FileNotFoundError:
+        return jsonify({'lines': []})
 
-        lines = lines[-limit:]
-        return jsonify({'lines': [l.strip() for l in lines]})
+    # Unchanged size and mtime mean an unchanged tail, so polls can get a 304
+    etag = f'{stat.st_size}-{stat.st_mtime_ns}-{limit}'
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+        response.set_etag(etag)
+        return response
 
+    try:
+        lines = _tail_lines(logs_path, limit)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+    response = jsonify({'lines': [l.decode('utf-8', 'replace').strip() for l in lines]})
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+def _tail_lines(path: Path, limit: int, chunk_size: int = 4096) -> list[bytes]:
+    """Read the last limit lines of a file, reading backwards from its end."""
+    if limit <= 0:
+        return []
+
+    with open(path, 'rb') as f:
+        position = f.seek(0, os.SEEK_END)
+        buf = b''
+        # One newline more than needed, so the first kept line is complete
+        while position > 0 and buf.count(b'\n') <= limit:
+            step = min(chunk_size, position)
+            position -= step
+            f.seek(position)
+            buf = f.read(step) + buf
+
+    return buf.splitlines()[-limit:]
+
 
 # ============== Page Routes ==============
 
+def _render_page(template: str) -> Response:
+    """Render a page once and serve the HTML from memory afterwards, with an ETag."""
+    # Pages are static shells filled in through the API; the rendering only
+    # depends on the endpoint (for the active nav link) and the script root
+    key = (request.endpoint, request.script_root)
+    cached = None if current_app.jinja_env.auto_reload else _page_cache.get(key)
+    if cached is None:
+        html = render_template(template)
+        etag = hashlib.blake2b(html.encode(), digest_size=8).hexdigest()
+        cached = _page_cache[key] = (html, etag)
+
+    response = make_response(cached[0])
+    response.set_etag(cached[1])
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
+
+
 @pages.route('/')
 @require_auth
 def dashboard():
     """Dashboard page."""
-    return render_template('dashboard.html')
+    return _render_page('dashboard.html')
 
 
 @pages.route('/cameras')
 @require_auth
 def cameras_page():
     """Cameras management page."""
-    return render_template('cameras.html')
+    return _render_page('cameras.html')
 
 
 @pages.route('/exports')
 @require_auth
 def exports_page():
     """Exports page."""
-    return render_template('exports.html')
+    return _render_page('exports.html')
 
 
 @pages.route('/settings')
 @require_auth
 def settings_page():
     """Settings page."""
-    return render_template('settings.html')
+    return _render_page('settings.html')
 
 
 # ============== App Factory ==============
 
+class CaptureMiddleware:
+    """WSGI middleware serving plain capture image GETs without going through Flask.
+
+    Only unconditional GET/HEAD requests for existing files take the fast
+    path; anything else (failed auth, bad paths, Range or conditional
+    headers) is passed on to the app, which handles it as usual.
+    """
+
+    PREFIX = '/api/captures/'
+    CONDITIONAL_HEADERS = (
+        'HTTP_RANGE', 'HTTP_IF_RANGE', 'HTTP_IF_NONE_MATCH', 'HTTP_IF_MODIFIED_SINCE'
+    )
+
+    def __init__(self, app, root: str, is_authorized: Callable[[dict], bool]):
+        self.app = app
+        self.root = root
+        self.is_authorized = is_authorized
+
+    def __call__(self, environ, start_response):
+        path_info = environ.get('PATH_INFO', '')
+        method = environ.get('REQUEST_METHOD')
+        if (
+            not path_info.startswith(self.PREFIX)
+            or method not in ('GET', 'HEAD')
+            or any(header in environ for header in self.CONDITIONAL_HEADERS)
+            or not self.is_authorized(environ)
+        ):
+            return self.app(environ, start_response)
+
+        try:
+            # PATH_INFO carries the raw bytes as latin-1 (PEP 3333)
+            rel_path = path_info[len(self.PREFIX):].encode('latin-1').decode('utf-8')
+        except UnicodeError:
+            return self.app(environ, start_response)
+
+        # open() raises ValueError on NUL bytes; the app answers those with a 404
+        if '\x00' in rel_path:
+            return self.app(environ, start_response)
+
+        path = os.path.normpath(os.path.join(self.root, rel_path))
+        if not path.startswith(self.root) or _is_hidden(path[len(self.root):]):
+            return self.app(environ, start_response)
+
+        try:
+            f = open(path, 'rb')
+        except OSError:
+            return self.app(environ, start_response)
+
+        stat = os.fstat(f.fileno())
+        # Same ETag as send_file generates, so revalidating through the app matches
+        etag = f'"{stat.st_mtime}-{stat.st_size}-{adler32(path.encode()) & 0xFFFFFFFF}"'
+        start_response('200 OK', [
+            ('Content-Type', 'image/jpeg'),
+            ('Content-Length', str(stat.st_size)),
+            ('ETag', etag),
+            ('Last-Modified', http_date(stat.st_mtime)),
+            ('Cache-Control', _CAPTURE_CACHE_CONTROL),
+        ])
+        if method == 'HEAD':
+            f.close()
+            return []
+        return wrap_file(environ, f)
+
+
+def _environ_authorized(environ: dict) -> bool:
+    """Check a raw WSGI request against the basic auth settings."""
+    web_ui = _config_manager.app_config.web_ui
+    if not web_ui.auth_enabled:
+        return True
+
+    auth = Authorization.from_header(environ.get('HTTP_AUTHORIZATION'))
+    return auth is not None and _credentials_valid(web_ui, auth.username, auth.password)
+
+
+def _load_secret_key(config_dir: Path) -> bytes:
+    """Get the session secret from SECRET_KEY, or from a key file created on first use.
+
+    The key file keeps sessions valid across restarts and between workers.
+    """
+    if os.environ.get('SECRET_KEY'):
+        return os.environ['SECRET_KEY'].encode()
+
+    key_path = config_dir / SECRET_KEY_FILENAME
+    try:
+        key = key_path.read_bytes()
+    except FileNotFoundError:
+        key = None
+    if key is not None and len(key) >= SECRET_KEY_BYTES:
+        return key
+
+    if key is not None:
+        # Truncated, e.g. by a crash while an older version wrote it
+        logger.warning(f"Replacing invalid session secret key at {key_path}")
+        key_path.unlink(missing_ok=True)
+
+    # Written in full under a temporary name, then linked into place; the
+    # link fails if a concurrently starting worker placed its key first
+    fd, tmp_path = tempfile.mkstemp(dir=config_dir, prefix=f'{SECRET_KEY_FILENAME}.')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(os.urandom(SECRET_KEY_BYTES))
+            f.flush()
+            os.fsync(f.fileno())
+        try:
+            os.link(tmp_path, key_path)
+            logger.info(f"Created session secret key at {key_path}")
+        except FileExistsError:
+            pass
+    finally:
+        os.unlink(tmp_path)
+
+    return key_path.read_bytes()
+
+
 def create_app(
     config_manager: ConfigManager,
     capture_manager: CaptureManager,
@@ -564,11 +989,14 @@ def create_app(
 ) -> Flask:
     """Create and configure the Flask application."""
     global _config_manager, _capture_manager, _schedule_manager, _exporter
+    global _captures_root, _exports_root
 
     _config_manager = config_manager
     _capture_manager = capture_manager
     _schedule_manager = schedule_manager
     _exporter = exporter
+    _captures_root = os.path.join(capture_manager.captures_root, '')
+    _exports_root = os.path.join(exporter.exports_root, '')
 
     app = Flask(
         __name__,
@@ -576,7 +1004,19 @@ def create_app(
         static_folder=Path(__file__).parent / 'static'
     )
 
-    app.secret_key = os.environ.get('SECRET_KEY', os.urandom(24))
+    # Also parses request bodies, since request.json goes through app.json
+    app.json = AppJSONProvider(app)
+
+    app.secret_key = _load_secret_key(config_manager.config_dir)
+
+    web_ui = config_manager.app_config.web_ui
+    app.config['USE_X_SENDFILE'] = web_ui.x_sendfile
+    app.config['X_ACCEL_REDIRECT'] = web_ui.x_accel_redirect
+
+    # Front-end servers send the files themselves when these are set; otherwise
+    # capture images skip Flask's dispatch
+    if not (web_ui.x_sendfile or web_ui.x_accel_redirect):
+        app.wsgi_app = CaptureMiddleware(app.wsgi_app, _captures_root, _environ_authorized)
 
     app.register_blueprint(api)
     app.register_blueprint(pages)
@@ -584,6 +1024,9 @@ def create_app(
     @app.errorhandler(404)
     def not_found(e):
         if request.path.startswith('/api/'):
+            # abort(404, description=...) names what was missing
+            if e.description != NotFound.description:
+                return jsonify({'error': e.description}), 404
             return jsonify({'error': 'Not found'}), 404
         return render_template('base.html', error='Page not found'), 404
 
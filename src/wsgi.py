@@ -0,0 +1,38 @@
+"""WSGI entry point for serving the web UI from a production server.
+
+    gunicorn -c gunicorn.conf.py src.wsgi:app
+
+Importing this module starts the capture scheduler inside the server
+process, so it must be served by exactly one worker process.
+"""
+
+import atexit
+import os
+import sys
+from pathlib import Path
+
+from . import main
+from .config import ConfigManager, get_config
+from .web.app import create_app
+
+# Capture threads block in C, which would stall a monkey-patched event loop
+if "gevent.monkey" in sys.modules and sys.modules["gevent.monkey"].is_module_patched("threading"):
+    raise RuntimeError("gevent workers are not supported; use the gthread worker class")
+
+config_dir = os.environ.get("RTSPSE_CONFIG_DIR")
+if config_dir:
+    main.config_manager = ConfigManager(Path(config_dir))
+    main.config_manager.load_all()
+else:
+    main.config_manager = get_config()
+
+main.setup_logging(main.config_manager)
+main.start_services()
+atexit.register(main.stop_services)
+
+app = create_app(
+    config_manager=main.config_manager,
+    capture_manager=main.capture_manager,
+    schedule_manager=main.schedule_manager,
+    exporter=main.exporter
+)